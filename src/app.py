@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import time
 from pathlib import Path
 
 # Bootstrap to support running as a standalone script: `python src/app.py`
@@ -14,36 +13,58 @@ if __name__ == "__main__" and __package__ is None:
 # Prefer relative imports; fallback to absolute
 import logging
 
-import keyboard
-
+from src.config import snapshot
 from src.config.characters import character_list, character_meta, characters
-from src.config.paths import cache_file, font_path
+from src.config.paths import PROJECT_ROOT, font_path
 from src.config.settings import (
     AUTO_PASTE_IMAGE,
     AUTO_SEND_IMAGE,
     BLOCK_HOTKEY,
+    COMPOSITE_MODE,
     ENABLE_WHITELIST,
     PASTE_HOTKEY,
+    PREWARM_ENABLED,
     SEND_HOTKEY,
     TEXT_ED_POS,
     TEXT_ST_POS,
+    TRACE_FILE,
+    WATCH_ENABLED,
     WHITELIST,
 )
-from src.io.clipboard import copy_png_bytes_to_clipboard, cut_all_capture
-from src.io.keys import send
+from src.io.clipboard import copy_dib_to_clipboard, cut_all_capture, wait_for_paste
+from src.io.keys import add_hotkey, send
 from src.io.window import get_foreground_exe_name
+from src.services.gen_queue import GenerationQueue
 from src.services.generator import (
+    PrecomputeJob,
+    Selection,
     State,
     ensure_character_prepared,
+    get_base_image,
     get_current_character,
-    get_selection,
+    mark_confirmed,
+    prune_stale_cache,
+    restore_selection,
+    snapshot_selection,
 )
-from src.services.paste_image import paste_image_to_bytes
-from src.services.render_text import render_text_to_bytes
+from src.services.paste_image import paste_image_to_image
+from src.services.prewarm import prewarmer
+from src.services.render_text import render_text_cached
+from src.services.result_cache import result_cache
+from src.services.watcher import Changes, watcher
+from src.utils.image_encode import encode_image
 from src.utils.logging_setup import setup_logging
+from src.utils.tracing import span, tracer
 
 logger = logging.getLogger(__name__)
 
+# 后台预合成任务（仅 precompute 模式）
+_precompute_job: PrecomputeJob | None = None
+# 生成队列：热键回调只入队，生成在独立线程中执行
+_gen_queue: GenerationQueue | None = None
+# TUI 中最近一次的选择（按名称），资源重新加载后据此恢复索引
+_selection: Selection | None = None
+
 
 def _log_text_preview(text: str, limit: int = 1000) -> str:
     try:
@@ -84,22 +105,24 @@ def _build_banner() -> str:
     return "\n".join(lines)
 
 
-def _generate_with_current_selection(state: State) -> str | None:
-    character_name = get_current_character(state)
-    if character_name not in state.confirmed_roles:
+def _generate_with_current_selection(
+    selection: Selection, wait_ms: float = 0.0
+) -> str | None:
+    # 每次生成分配编号，各阶段耗时汇总到 TUI 状态行
+    with tracer.generation():
+        tracer.record("queue_wait", wait_ms)
+        return _generate(selection)
+
+
+def _generate(selection: Selection) -> str | None:
+    character_name = selection.character_name
+    if not selection.confirmed:
         msg = "未确认当前角色（请在 TUI 中按 C 预加载）"
         logger.warning(msg)
         return msg
 
-    expr_name, bg_name = get_selection(state)
-    baseimage_file = cache_file(character_name, expr_name, bg_name)
-    logger.info(
-        "开始生成: role=%s expr=%s bg=%s base=%s",
-        character_name,
-        expr_name,
-        bg_name,
-        baseimage_file,
-    )
+    expr_name, bg_name = selection.expr_name, selection.bg_name
+    logger.info("开始生成: role=%s expr=%s bg=%s", character_name, expr_name, bg_name)
 
     rect_top_left = TEXT_ST_POS
     rect_bottom_right = TEXT_ED_POS
@@ -108,7 +131,8 @@ def _generate_with_current_selection(state: State) -> str | None:
     text = ""
     image = None
     try:
-        text, image = cut_all_capture()
+        with span("cut"):
+            text, image = cut_all_capture()
     except Exception as e:
         logger.exception("剪切当前内容失败: %s", e)
         text, image = "", None
@@ -131,42 +155,59 @@ def _generate_with_current_selection(state: State) -> str | None:
         logger.warning(msg)
         return msg
 
+    if image is not None:
+        try:
+            with span("base"):
+                base_image = get_base_image(character_name, expr_name, bg_name)
+        except Exception as e:
+            logger.exception("加载底图失败: %s", e)
+            return f"加载底图失败: {e}"
+
     try:
+        # 直接编码为剪贴板使用的 DIB，不经过 PNG 编解码
         if image is not None:
-            png_bytes = paste_image_to_bytes(
-                base_image=baseimage_file,
+            result = paste_image_to_image(
+                base_image=base_image,
                 rect_top_left=rect_top_left,
                 rect_bottom_right=rect_bottom_right,
                 content_image=image,
                 role_name=character_name,
             )
+            dib_data = encode_image(result, "dib")
         else:
+            # 文本经过结果缓存：重复发送的相同文本直接取回已编码的 DIB
             fp = font_path(characters[character_name]["font"])  # resource/font 下
-            png_bytes = render_text_to_bytes(
-                base_image=baseimage_file,
+            dib_data = render_text_cached(
+                character_name,
+                expr_name,
+                bg_name,
                 rect_top_left=rect_top_left,
                 rect_bottom_right=rect_bottom_right,
                 text=text,
                 font_path=fp,
-                role_name=character_name,
+                output_format="dib",
             )
     except Exception as e:
         logger.exception("生成失败: %s", e)
         return f"生成失败: {e}"
 
     try:
-        copy_png_bytes_to_clipboard(png_bytes)
-        logger.info("已写入剪贴板 PNG: %d bytes", len(png_bytes))
+        with span("clipboard"):
+            copy_dib_to_clipboard(dib_data)
+        logger.info("已写入剪贴板 DIB: %d bytes", len(dib_data))
     except Exception as e:
         logger.exception("写入剪贴板失败: %s", e)
         return f"复制到剪贴板失败: {e}"
 
     if AUTO_PASTE_IMAGE:
         try:
-            send(PASTE_HOTKEY)
-            time.sleep(0.3)
+            with span("paste"):
+                send(PASTE_HOTKEY)
+            with span("paste_wait"):
+                wait_for_paste()
             if AUTO_SEND_IMAGE:
-                send(SEND_HOTKEY)
+                with span("send"):
+                    send(SEND_HOTKEY)
             logger.info("已模拟粘贴%s", "并发送" if AUTO_SEND_IMAGE else "")
         except Exception as e:
             logger.exception("模拟粘贴/发送失败: %s", e)
@@ -183,9 +224,9 @@ def _global_send_callback(state: State):
             send(SEND_HOTKEY)
             return
 
-    msg = _generate_with_current_selection(state)
-    if msg:
-        logger.info("全局发送回调: %s", msg)
+    # 钩子线程中只拍下选择快照并入队，立即返回
+    if _gen_queue is not None:
+        _gen_queue.submit(snapshot_selection(state))
 
 
 def _setup_global_send_hotkey(state: State) -> None:
@@ -193,7 +234,7 @@ def _setup_global_send_hotkey(state: State) -> None:
         True if (BLOCK_HOTKEY or True) else False
     )  # 发送热键一律抑制，避免原始回车提前发送
     try:
-        keyboard.add_hotkey(
+        add_hotkey(
             SEND_HOTKEY, lambda: _global_send_callback(state), suppress=suppress_flag
         )
         logger.info("已注册全局发送热键: %s (suppress=%s)", SEND_HOTKEY, suppress_flag)
@@ -201,11 +242,28 @@ def _setup_global_send_hotkey(state: State) -> None:
         logger.exception("注册全局发送热键失败: %s", e)
 
 
+def _on_precompute_done(state: State, job: PrecomputeJob) -> None:
+    if job.completed:
+        mark_confirmed(state, job.character_name)
+        logger.info("已确认并预加载角色：%s", job.character_name)
+
+
 def _on_confirm(state: State) -> str | None:
+    global _precompute_job
     name = get_current_character(state)
+    if COMPOSITE_MODE == "precompute":
+        job = _precompute_job
+        if job is not None and job.running:
+            if job.character_name == name and not job.cancelled:
+                return job.status_text()
+            job.cancel()
+        _precompute_job = PrecomputeJob(
+            name, on_done=lambda j: _on_precompute_done(state, j)
+        ).start()
+        return _precompute_job.status_text()
     try:
         ensure_character_prepared(name)
-        state.confirmed_roles.add(name)
+        mark_confirmed(state, name)
         msg = f"已确认并预加载角色：{name}"
         logger.info(msg)
         return msg
@@ -214,12 +272,60 @@ def _on_confirm(state: State) -> str | None:
         return f"预加载失败: {e}"
 
 
+def _on_select(state: State) -> None:
+    # 切换角色时取消其他角色的预合成，已落盘部分下次确认时继续
+    job = _precompute_job
+    if job is not None and job.running:
+        if job.character_name != get_current_character(state):
+            job.cancel()
+    global _selection
+    _selection = sel = snapshot_selection(state)
+    if PREWARM_ENABLED:
+        prewarmer.schedule(sel.character_name, sel.expr_name, sel.bg_name)
+
+
+def _on_resources_changed(state: State, changes: Changes) -> None:
+    # 注册表已刷新：按名称恢复选择，并重新预热可能已失效的当前组合
+    if _selection is not None:
+        restore_selection(state, _selection)
+    _on_select(state)
+
+
+def _get_status(state: State) -> str | None:
+    global _precompute_job
+    lines = []
+    job = _precompute_job
+    if job is not None:
+        if not job.running:
+            # 结束后只报告一次最终状态
+            _precompute_job = None
+        lines.append(job.status_text())
+    timing = tracer.status_line()
+    if timing:
+        lines.append(timing)
+    cached = result_cache.status_line()
+    if cached:
+        lines.append(cached)
+    return "\n".join(lines) or None
+
+
 def main() -> None:
     setup_logging()  # overwrite log.txt on each start
     logger.info("应用启动。角色数=%d", len(character_list))
+    try:
+        prune_stale_cache()
+    except Exception as e:
+        logger.exception("检查缓存清单失败: %s", e)
     print(_build_banner())
 
+    global _gen_queue
     state = State()
+    _gen_queue = GenerationQueue(_generate_with_current_selection)
+    _on_select(state)
+    snapshot.persist()  # 角色表与设置已加载，下次启动可跳过 YAML 解析
+    if WATCH_ENABLED:
+        watcher.add_listener(lambda changes: _on_resources_changed(state, changes))
+        watcher.start()
 
     # 全局发送热键（在后台监听）
     _setup_global_send_hotkey(state)
@@ -229,8 +335,19 @@ def main() -> None:
         from .ui.tui import run_tui  # late import to avoid circular
     except Exception:
         from src.ui.tui import run_tui
-    run_tui(state, on_confirm=_on_confirm, on_generate=lambda s: None)
+    run_tui(
+        state,
+        on_confirm=_on_confirm,
+        on_generate=lambda s: None,
+        on_select=_on_select,
+        get_status=_get_status,
+    )
 
+    try:
+        tracer.dump(PROJECT_ROOT / TRACE_FILE)
+    except Exception as e:
+        logger.exception("写入耗时统计失败: %s", e)
+    snapshot.persist()  # 运行中热重载过的配置
     logger.info("应用退出。")
 
 
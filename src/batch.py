@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Set, Tuple
+
+# Bootstrap to support running as a standalone script: `python src/batch.py`
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+from src.config.settings import OUTPUT_FORMAT
+from src.services.generator import precompute_pairs, stale_pairs
+from src.services.jobs import RenderJob, parse_job, render_job, warm_roles
+from src.utils.logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# 同一底图的连续任务打包交给同一个工作进程，使其底图缓存保持命中
+CHUNK_SIZE = 16
+
+# (序号, 输出文件名, 编码结果, 错误信息)
+Result = Tuple[int, str, bytes | None, str | None]
+
+
+def _read_jobs(stream: IO[str]) -> Iterator[RenderJob | Tuple[int, str]]:
+    for lineno, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield parse_job(json.loads(line), index=lineno)
+        except Exception as e:
+            yield (lineno, str(e))
+
+
+def _split_jobs(
+    parsed: List[RenderJob | Tuple[int, str]], output_format: str
+) -> Tuple[List[RenderJob], List[Tuple[int, str]]]:
+    """分出有效任务与无效记录；输出文件名重复的任务视为无效，避免互相覆盖。"""
+    jobs: List[RenderJob] = []
+    invalid: List[Tuple[int, str]] = []
+    seen: Dict[str, int] = {}
+    for item in parsed:
+        if not isinstance(item, RenderJob):
+            invalid.append(item)
+            continue
+        name = item.output_name(output_format)
+        key = name.lower()  # Windows 文件名不区分大小写
+        if key in seen:
+            invalid.append((item.index, f"输出文件名与第 {seen[key]} 行重复: {name}"))
+            continue
+        seen[key] = item.index
+        jobs.append(item)
+    return jobs, invalid
+
+
+def _chunks(jobs: List[RenderJob]) -> List[List[RenderJob]]:
+    ordered = sorted(jobs, key=lambda j: (j.base_key, j.index))
+    chunks: List[List[RenderJob]] = []
+    for job in ordered:
+        last = chunks[-1] if chunks else None
+        if last and last[0].base_key == job.base_key and len(last) < CHUNK_SIZE:
+            last.append(job)
+        else:
+            chunks.append([job])
+    return chunks
+
+
+def _prepare_bases(jobs: List[RenderJob]) -> None:
+    # 所需底图先各合成一次写入磁盘缓存，避免多个渲染进程重复合成同一张
+    by_role: Dict[str, Set[Tuple[str, str]]] = {}
+    for job in jobs:
+        by_role.setdefault(job.role, set()).add((job.expression, job.background))
+    for role, pairs in sorted(by_role.items()):
+        precompute_pairs(role, stale_pairs(role, sorted(pairs)))
+
+
+def _init_worker(roles: List[str]) -> None:
+    warm_roles(roles)
+
+
+def _render_chunk(chunk: List[RenderJob], output_format: str) -> List[Result]:
+    results: List[Result] = []
+    for job in chunk:
+        name = job.output_name(output_format)
+        try:
+            results.append((job.index, name, render_job(job, output_format), None))
+        except Exception as e:
+            results.append((job.index, name, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+class _Sink:
+    """输出目标：目录下的文件，或 tar 流（文件或标准输出）。"""
+
+    def __init__(self, out_dir: Path | None, tar_path: str | None) -> None:
+        self._dir = out_dir
+        self._tar: tarfile.TarFile | None = None
+        self._tar_file: IO[bytes] | None = None
+        if tar_path is not None:
+            if tar_path == "-":
+                fileobj = sys.stdout.buffer
+            else:
+                fileobj = self._tar_file = open(tar_path, "wb")
+            self._tar = tarfile.open(fileobj=fileobj, mode="w|")
+        elif out_dir is not None:
+            out_dir.mkdir(parents=True, exist_ok=True)
+
+    def write(self, name: str, data: bytes) -> None:
+        if self._tar is not None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._tar.addfile(info, io.BytesIO(data))
+        else:
+            (self._dir / name).write_bytes(data)
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+        if self._tar_file is not None:
+            self._tar_file.close()
+
+
+def run_batch(
+    jobs: List[RenderJob],
+    sink: _Sink,
+    *,
+    workers: int = 0,
+    output_format: str = OUTPUT_FORMAT,
+) -> Tuple[int, int]:
+    """在进程池中渲染全部任务并写入 sink，返回 (成功数, 失败数)。"""
+    workers = workers or os.cpu_count() or 1
+    roles = sorted({j.role for j in jobs})
+    chunks = _chunks(jobs)
+    _prepare_bases(jobs)
+    ok = failed = 0
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(roles,)
+    ) as executor:
+        pending = set()
+        todo = iter(chunks)
+        while True:
+            # 限制在途任务数量，避免结果堆积在内存中
+            for chunk in todo:
+                pending.add(executor.submit(_render_chunk, chunk, output_format))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                for index, name, data, error in fut.result():
+                    if data is None:
+                        failed += 1
+                        logger.error("第 %d 行渲染失败: %s", index, error)
+                    else:
+                        sink.write(name, data)
+                        ok += 1
+    return ok, failed
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch",
+        description="无界面批量生成文本框图片（每行一条 JSON 记录）",
+    )
+    parser.add_argument("jobs", help="JSONL 任务文件，- 表示标准输入")
+    out = parser.add_mutually_exclusive_group(required=True)
+    out.add_argument("-o", "--out-dir", type=Path, help="输出目录")
+    out.add_argument("--tar", metavar="PATH", help="输出为 tar 流，- 表示标准输出")
+    parser.add_argument(
+        "-f",
+        "--format",
+        default=OUTPUT_FORMAT,
+        choices=["png", "webp", "jpeg", "dib"],
+        help="输出格式（默认取 OUTPUT_FORMAT 设置）",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=0, help="工作进程数（0 表示 CPU 核数）"
+    )
+    args = parser.parse_args(argv)
+
+    # 单独的日志文件：不覆盖正在运行的 TUI 所写的 log.txt
+    setup_logging("batch.log")
+
+    if args.jobs == "-":
+        parsed = list(_read_jobs(sys.stdin))
+    else:
+        with open(args.jobs, encoding="utf-8") as f:
+            parsed = list(_read_jobs(f))
+    jobs, invalid = _split_jobs(parsed, args.format)
+    for lineno, error in invalid:
+        logger.error("第 %d 行无效: %s", lineno, error)
+
+    sink = _Sink(args.out_dir, args.tar)
+    start = time.perf_counter()
+    try:
+        ok, failed = run_batch(
+            jobs, sink, workers=args.workers, output_format=args.format
+        )
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - start
+
+    logger.info(
+        "批量生成完成: 成功 %d，失败 %d，无效 %d，用时 %.2fs，%.1f 张/秒",
+        ok,
+        failed,
+        len(invalid),
+        elapsed,
+        ok / elapsed if elapsed > 0 else 0.0,
+    )
+    return 0 if not failed and not invalid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
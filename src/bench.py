@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import multiprocessing
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Bootstrap to support running as a standalone script: `python src/bench.py`
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+# 基准用例：名称 -> (准备函数, 重复次数, 是否预热)。准备函数返回被计时的无参函数
+Case = Tuple[Callable[[], Callable[[], object]], int, bool]
+
+TEXT_RECT = ((728, 355), (2339, 800))
+# 单次耗时较长的文本用例，减少重复次数
+SLOW_TEXTS = {"cjk10k", "words", "brackets"}
+
+
+def _texts() -> Dict[str, str]:
+    rng = random.Random(1)
+    cjk = "".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(10000))
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = " ".join(
+        "".join(rng.choice(letters) for _ in range(rng.randint(1, 12)))
+        for _ in range(1500)
+    )
+    brackets = "".join(
+        rng.choice(["[", "]", "【", "】", "重点", "word ", "文字"]) for _ in range(1500)
+    )
+    return {
+        "short": "你好",
+        "medium": (
+            "今天天气不错，我们去[公园]散步吧！【重点】记得带上 water and snacks。" * 2
+        ),
+        "cjk10k": cjk,
+        "words": words,
+        "brackets": brackets,
+    }
+
+
+def _synthetic_base() -> "Image.Image":
+    from PIL import Image
+
+    # 横向渐变，尺寸与合成底图一致
+    size = (2560, 834)
+    gradient = Image.linear_gradient("L").resize(size)
+    alpha = Image.new("L", size, 255)
+    return Image.merge("RGBA", (gradient, gradient.rotate(180), gradient, alpha))
+
+
+def _bundled_base() -> "Image.Image | None":
+    from src.config.characters import character_list, characters
+    from src.config.paths import get_background_files
+    from src.services.generator import compose_base
+
+    backgrounds = get_background_files()
+    for role in character_list:
+        exprs = characters[role]["expression_files"]
+        if exprs and backgrounds:
+            return compose_base(role, exprs[0], backgrounds[0])
+    return None
+
+
+def build_cases(precompute: bool) -> Dict[str, Case]:
+    from PIL import Image
+
+    from src.config.characters import character_list, characters
+    from src.config.paths import font_path, get_background_files
+    from src.config.text_configs import text_configs_dict
+    from src.utils.image_paste import paste_image_auto
+    from src.utils.text_draw import compress_image, draw_text_auto
+
+    role = character_list[0] if character_list else "unknown"
+    fp = font_path(characters[role]["font"]) if role in characters else None
+    bases = {"synthetic": _synthetic_base}
+    if character_list:
+        bases["bundled"] = _bundled_base
+
+    cases: Dict[str, Case] = {}
+    for base_name, make_base in bases.items():
+        for text_name, text in _texts().items():
+
+            def setup(make_base=make_base, text=text):
+                base = make_base()
+                return lambda: draw_text_auto(
+                    image_source=base,
+                    top_left=TEXT_RECT[0],
+                    bottom_right=TEXT_RECT[1],
+                    text=text,
+                    align="left",
+                    valign="top",
+                    color=(255, 255, 255),
+                    max_font_height=145,
+                    font_path=fp,
+                    role_name=role,
+                    text_configs_dict=text_configs_dict,
+                )
+
+            repeat = 3 if text_name in SLOW_TEXTS else 5
+            cases[f"text/{base_name}/{text_name}"] = (setup, repeat, True)
+
+    def paste_setup():
+        base = _synthetic_base()
+        content = Image.linear_gradient("L").resize((4000, 3000)).convert("RGBA")
+        return lambda: paste_image_auto(
+            image_source=base,
+            top_left=TEXT_RECT[0],
+            bottom_right=TEXT_RECT[1],
+            content_image=content,
+            padding=12,
+            allow_upscale=True,
+            role_name=role,
+            text_configs_dict=text_configs_dict,
+        )
+
+    cases["paste/large"] = (paste_setup, 5, True)
+
+    def compress_setup():
+        base = _synthetic_base()
+        return lambda: compress_image(base)
+
+    cases["compress_image"] = (compress_setup, 5, True)
+
+    if character_list:
+
+        def pipeline_setup(cached: bool):
+            # 内存后端模拟输入框与剪贴板：剪切 -> 生成 -> 写剪贴板 -> 粘贴 -> 发送
+            from src.app import _generate
+            from src.io.backend import MemoryBackend, set_backend
+            from src.services.generator import Selection
+            from src.services.result_cache import result_cache
+
+            backend = set_backend(MemoryBackend())
+            exprs = characters[role]["expression_files"]
+            bg = (get_background_files() or [""])[0]
+            selection = Selection(role, exprs[0] if exprs else "", bg, True)
+            text = _texts()["medium"]
+
+            def run():
+                if not cached:
+                    # 每轮都完整渲染；cached 用例在预热后命中结果缓存
+                    result_cache.clear()
+                backend.input_text = text
+                return _generate(selection)
+
+            return run
+
+        cases["pipeline/text"] = (lambda: pipeline_setup(False), 5, True)
+        cases["pipeline/text-cached"] = (lambda: pipeline_setup(True), 5, True)
+
+    def startup_setup(snapshot: bool):
+        # 新进程中导入应用、读取角色表并像 TUI 启动一样保存快照；预热一轮后快照已写入临时缓存目录
+        env = dict(os.environ, TEXTBOX_BACKEND="memory")
+        env["TEXTBOX_STARTUP_SNAPSHOT"] = "1" if snapshot else "0"
+        cmd = [
+            sys.executable,
+            "-c",
+            "import src.app; len(src.app.character_list); src.app.snapshot.persist()",
+        ]
+        root = Path(__file__).resolve().parent.parent
+        return lambda: subprocess.run(cmd, cwd=root, env=env, check=True)
+
+    cases["startup/snapshot"] = (lambda: startup_setup(True), 5, True)
+    cases["startup/no-snapshot"] = (lambda: startup_setup(False), 5, True)
+
+    if precompute and character_list:
+
+        def precompute_setup():
+            from src.services.generator import clear_cache, generate_and_save_images
+
+            def run():
+                # CACHE_DIR 已指向临时目录，每轮从空缓存开始
+                clear_cache()
+                return generate_and_save_images(role)
+
+            return run
+
+        # 单次即为完整的冷启动预合成，不预热；内存在计时的同一轮中统计
+        cases[f"precompute/{role}"] = (precompute_setup, 1, False)
+    return cases
+
+
+def _peak_rss_kb() -> int | None:
+    """
+    本进程与已回收子进程中最大的常驻内存峰值（KB），包含 Pillow 像素缓冲与 FreeType 等
+    原生分配；Windows 上只统计本进程。无法获取时返回 None。
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset // 1024
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    unit = 1024 if sys.platform == "darwin" else 1
+    return (
+        max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        )
+        // unit
+    )
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: bool = True) -> dict:
+    """预热一次后计时 repeat 次；不预热的用例只运行一次。"""
+    if warmup:
+        fn()
+    times: List[float] = []
+    for _ in range(repeat if warmup else 1):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+    }
+
+
+def _case_worker(name: str, precompute: bool, conn) -> None:
+    try:
+        setup, repeat, warmup = build_cases(precompute)[name]
+        result = measure(setup(), repeat, warmup)
+        result["peak_rss_kb"] = _peak_rss_kb()
+        conn.send((result, None))
+    except BaseException as e:
+        conn.send((None, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_case(name: str, precompute: bool) -> dict:
+    """
+    在全新的子进程中运行单个用例，使内存峰值只反映该用例（含其子进程与进程池），
+    不受先前用例与基准自身导入的影响。
+    """
+    ctx = multiprocessing.get_context("spawn")
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_case_worker, args=(name, precompute, send))
+    proc.start()
+    send.close()
+    try:
+        result, error = recv.recv()
+    except EOFError:
+        result, error = None, "子进程异常退出"
+    proc.join()
+    if error is not None:
+        raise RuntimeError(f"用例 {name} 失败: {error}")
+    return result
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """返回中位数耗时比基线慢超过 threshold（比例）的用例说明。"""
+    regressions: List[str] = []
+    old = baseline.get("results", {})
+    for name, cur in results.items():
+        ref = old.get(name)
+        if not ref:
+            print(f"  {name:36s} {cur['median_ms']:10.2f} ms   (基线中无此项)")
+            continue
+        ratio = cur["median_ms"] / ref["median_ms"] if ref["median_ms"] else 1.0
+        # 旧版基线只有 Python 堆统计（peak_kb），不可比较
+        cur_rss, ref_rss = cur.get("peak_rss_kb"), ref.get("peak_rss_kb")
+        mem = f"x{cur_rss / ref_rss:5.2f}" if cur_rss and ref_rss else "  n/a"
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- 变慢"
+            regressions.append(
+                f"{name}: {ref['median_ms']:.2f} -> {cur['median_ms']:.2f} ms"
+            )
+        print(
+            f"  {name:36s} {cur['median_ms']:10.2f} ms"
+            f"  x{ratio:5.2f}  内存 {mem}{flag}"
+        )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.bench", description="渲染热路径微基准"
+    )
+    parser.add_argument("-o", "--out", type=Path, help="结果写入的 JSON 文件")
+    parser.add_argument("-b", "--baseline", type=Path, help="与之比较的基线 JSON")
+    parser.add_argument(
+        "-k", "--filter", default="", help="只运行名称包含该字符串的用例"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="判定变慢的比例（默认 0.1 即 10%%）",
+    )
+    parser.add_argument(
+        "--no-precompute", action="store_true", help="跳过整角色预合成用例（较慢）"
+    )
+    args = parser.parse_args(argv)
+
+    # 预合成与底图缓存写入临时目录，不影响正式缓存；须在导入 src 模块前设置
+    tmp = tempfile.TemporaryDirectory(prefix="textbox-bench-")
+    os.environ["TEXTBOX_CACHE_DIR"] = tmp.name
+
+    from PIL import __version__ as pillow_version
+
+    results: Dict[str, dict] = {}
+    with tmp:
+        for name in build_cases(not args.no_precompute):
+            if args.filter not in name:
+                continue
+            results[name] = r = run_case(name, not args.no_precompute)
+            rss = r["peak_rss_kb"]
+            print(
+                f"{name:38s} median {r['median_ms']:10.2f} ms"
+                f"  min {r['min_ms']:10.2f} ms  peak RSS "
+                + (f"{rss / 1024:8.1f} MB" if rss is not None else "     n/a")
+            )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pillow": pillow_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        print(f"结果已写入 {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print(f"与基线比较（{baseline.get('meta', {}).get('time', '?')}）：")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("变慢的用例：")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
-from .loader import load_character_meta
-from .paths import CHARACTER_DIR
+from .paths import CHARACTER_DIR, CONFIG_DIR
+from .registry import LazyMapping, LazySequence
 from .settings import DEFAULT_FONT
+from .snapshot import cached
 
 # Cache for expression file lists per character
 _EXPRESSION_FILES_CACHE: Dict[str, List[str]] = {}
@@ -26,17 +27,62 @@ def get_expression_files(char_id: str) -> List[str]:
     return files
 
 
-# Build characters dict dynamically: expression_files = list of filenames; font from YAML meta (optional)
-_meta, _order_by_name = load_character_meta()
+def _load_meta() -> Tuple[Dict[str, dict], List[str]]:
+    from .loader import load_character_meta  # imports yaml; skipped on a snapshot hit
 
-characters: Dict[str, dict] = {}
-for cid, m in _meta.items():
-    expr_files = get_expression_files(cid)
-    font = m.get("font") or DEFAULT_FONT
-    characters[cid] = {"expression_files": expr_files, "font": font}
+    meta, order = cached(
+        "character_meta", [CONFIG_DIR / "character.yaml"], load_character_meta
+    )
+    for m in meta.values():
+        m["color"] = tuple(m["color"])
+    return meta, list(order)
 
-# character list ordered by display name (as requested)
-character_list: List[str] = [cid for cid in _order_by_name if cid in characters]
 
+def _load_expressions(ids: List[str]) -> Dict[str, List[str]]:
+    paths = [CHARACTER_DIR, *(CHARACTER_DIR / cid for cid in ids)]
+    files = cached(
+        "expression_files",
+        paths,
+        lambda: {cid: get_expression_files(cid) for cid in ids},
+    )
+    _EXPRESSION_FILES_CACHE.update(files)
+    return files
+
+
+_registry: Tuple[Dict[str, dict], List[str], Dict[str, dict]] | None = None
+
+
+def _build_registry() -> Tuple[Dict[str, dict], List[str], Dict[str, dict]]:
+    # Build characters dict dynamically: expression_files = list of filenames; font from YAML meta (optional)
+    meta, order_by_name = _load_meta()
+    expressions = _load_expressions(list(meta))
+    chars: Dict[str, dict] = {}
+    for cid, m in meta.items():
+        font = m.get("font") or DEFAULT_FONT
+        chars[cid] = {"expression_files": expressions.get(cid, []), "font": font}
+    # character list ordered by display name (as requested)
+    ordered = [cid for cid in order_by_name if cid in chars]
+    return chars, ordered, meta
+
+
+def _get_registry() -> Tuple[Dict[str, dict], List[str], Dict[str, dict]]:
+    global _registry
+    if _registry is None:
+        _registry = _build_registry()
+    return _registry
+
+
+# Registries load on first access (from the startup snapshot when nothing changed)
+characters: LazyMapping[str, dict] = LazyMapping(lambda: _get_registry()[0])
+character_list: LazySequence[str] = LazySequence(lambda: _get_registry()[1])
 # Export meta too for other modules that need name/color
-character_meta: Dict[str, dict] = _meta
+character_meta: LazyMapping[str, dict] = LazyMapping(lambda: _get_registry()[2])
+
+
+def reload() -> None:
+    """Re-read character.yaml and the expression directories into the registries."""
+    global _registry
+    _EXPRESSION_FILES_CACHE.clear()
+    _registry = _build_registry()
+    for registry in (characters, character_list, character_meta):
+        registry.reload()
@@ -3,14 +3,14 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Dict, Tuple
 
-import yaml
-
 from .paths import CONFIG_DIR
 
 
 def _read_yaml(path: Path) -> dict:
     if not path.exists():
         return {}
+    import yaml  # only needed when the startup snapshot is stale
+
     with path.open("r", encoding="utf-8") as f:
         data = yaml.safe_load(f) or {}
     if not isinstance(data, dict):
@@ -20,28 +20,71 @@ CHARACTER_DIR = RESOURCE_ROOT / "character"
 FONT_DIR = RESOURCE_ROOT / "font"
 
 # Cache directory (default repo_root/cache). Allow override via env.
+# Created on first write, see ensure_cache_dir().
 CACHE_DIR = Path(os.getenv("TEXTBOX_CACHE_DIR", str(PROJECT_ROOT / "cache")))
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
+_cache_dir_ready = False
+
+
+def ensure_cache_dir() -> Path:
+    """Create CACHE_DIR if needed (once per process) and return it."""
+    global _cache_dir_ready
+    if not _cache_dir_ready:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _cache_dir_ready = True
+    return CACHE_DIR
 
 
 def font_path(font_file: str) -> Path:
     return FONT_DIR / font_file
 
 
-def get_background_files() -> list[str]:
-    """Return sorted list of PNG filenames (without extension) from background directory, ordered lexicographically."""
+_BACKGROUND_FILES: list[str] | None = None
+
+
+def _scan_background_files() -> list[str]:
     if not BACKGROUND_DIR.is_dir():
         return []
     return sorted([p.stem for p in BACKGROUND_DIR.glob("*.png")])
 
 
-def compose_name(character: str, expr_name: str, bg_name: str) -> str:
+def get_background_files() -> list[str]:
+    """Return sorted list of PNG filenames (without extension) from background directory, ordered lexicographically.
+
+    The directory is scanned once; call reload_background_files() after it changes.
+    """
+    global _BACKGROUND_FILES
+    if _BACKGROUND_FILES is None:
+        _BACKGROUND_FILES = _scan_background_files()
+    return _BACKGROUND_FILES
+
+
+def reload_background_files() -> list[str]:
+    global _BACKGROUND_FILES
+    _BACKGROUND_FILES = _scan_background_files()
+    return _BACKGROUND_FILES
+
+
+def compose_name(
+    character: str, expr_name: str, bg_name: str, suffix: str = ".png"
+) -> str:
     """Generate cache filename from character, expression filename, and background filename."""
     # Sanitize filenames to avoid issues with special characters
     safe_expr = expr_name.replace(" ", "_").replace("(", "").replace(")", "")
     safe_bg = bg_name.replace(" ", "_").replace("(", "").replace(")", "")
-    return f"{character}_{safe_expr}_{safe_bg}.png"
+    return f"{character}_{safe_expr}_{safe_bg}{suffix}"
+
+
+# Composited bases are stored as PNG or as raw RGBA (see utils/raw_image.py)
+CACHE_SUFFIXES = {"png": ".png", "raw": ".rgba"}
 
 
 def cache_file(character: str, expr_name: str, bg_name: str) -> Path:
-    return CACHE_DIR / compose_name(character, expr_name, bg_name)
+    from .settings import CACHE_FORMAT  # settings imports this module via loader
+
+    suffix = CACHE_SUFFIXES.get(CACHE_FORMAT, ".png")
+    return CACHE_DIR / compose_name(character, expr_name, bg_name, suffix)
+
+
+def iter_cache_files() -> list[Path]:
+    """Return all cached composite files regardless of storage format."""
+    return [p for s in CACHE_SUFFIXES.values() for p in CACHE_DIR.glob(f"*{s}")]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Generic, Iterator, List, Mapping, Sequence, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+T = TypeVar("T")
+
+
+class _Lazy(Generic[T]):
+    """Build a value on first access; ``reload()`` rebuilds it and swaps it in."""
+
+    def __init__(self, load: Callable[[], T]) -> None:
+        self._load = load
+        self._value: T | None = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> T:
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._load()
+                value = self._value
+        return value
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def reload(self) -> None:
+        # Build first so readers never see a half-loaded registry
+        value = self._load()
+        with self._lock:
+            self._value = value
+
+
+class LazyMapping(_Lazy[Dict[K, V]], Mapping[K, V]):
+    """Read-only dict view over a loader, e.g. the character registry."""
+
+    def __getitem__(self, key: K) -> V:
+        return self._get()[key]
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._get())
+
+    def __len__(self) -> int:
+        return len(self._get())
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._get()
+
+    def get(self, key: K, default=None):
+        return self._get().get(key, default)
+
+    def __repr__(self) -> str:
+        if not self.loaded:
+            return "LazyMapping(<unloaded>)"
+        return f"LazyMapping({self._get()!r})"
+
+
+class LazySequence(_Lazy[List[T]], Sequence[T]):
+    """Read-only list view over a loader, e.g. the ordered character ids."""
+
+    def __getitem__(self, index):
+        return self._get()[index]
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._get())
+
+    def __len__(self) -> int:
+        return len(self._get())
+
+    def __contains__(self, value: object) -> bool:
+        return value in self._get()
+
+    def index(self, value, *args) -> int:
+        return self._get().index(value, *args)
+
+    def __repr__(self) -> str:
+        if not self.loaded:
+            return "LazySequence(<unloaded>)"
+        return f"LazySequence({self._get()!r})"
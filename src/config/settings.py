@@ -2,11 +2,19 @@ from __future__ import annotations
 
 from typing import Any
 
-# Load overrides from config/settings.yaml if present
+# Load overrides from config/settings.yaml if present (via the startup snapshot)
 try:
-    from .loader import load_settings
+    from .paths import CONFIG_DIR
+    from .snapshot import cached
 
-    _ov: dict[str, Any] = load_settings()
+    def _load_settings() -> dict[str, Any]:
+        from .loader import load_settings
+
+        return load_settings()
+
+    _ov: dict[str, Any] = cached(
+        "settings", [CONFIG_DIR / "settings.yaml"], _load_settings
+    )
 except Exception:
     _ov = {}
 
@@ -24,7 +32,19 @@ PASTE_HOTKEY: str = _g("PASTE_HOTKEY", "ctrl+v")
 SEND_HOTKEY: str = _g("SEND_HOTKEY", "enter")
 
 BLOCK_HOTKEY: bool = bool(_g("BLOCK_HOTKEY", False))  # 生成热键是否阻塞
-DELAY: float = float(_g("DELAY", 0.1))  # 操作间隔（秒）
+# 剪切后等待剪贴板变化的最长时间（秒，至少 0.12）
+DELAY: float = float(_g("DELAY", 0.1))
+# 等待剪贴板变化时的轮询间隔（秒）
+CLIPBOARD_POLL_INTERVAL: float = max(0.001, float(_g("CLIPBOARD_POLL_INTERVAL", 0.01)))
+# 剪贴板序列号变化后需保持不变的时间（秒），等待程序写完所有格式
+CLIPBOARD_SETTLE: float = max(0.0, float(_g("CLIPBOARD_SETTLE", 0.02)))
+# 粘贴后等待目标程序读取剪贴板的最长时间（秒）
+PASTE_TIMEOUT: float = max(0.0, float(_g("PASTE_TIMEOUT", 0.3)))
+# 目标程序读取剪贴板后、发送前再等待的时间（秒）
+PASTE_SETTLE: float = max(0.0, float(_g("PASTE_SETTLE", 0.05)))
+# 平台后端：auto=Windows 上使用 windows，其余系统使用 memory（内存模拟，无界面运行）；
+# 环境变量 TEXTBOX_BACKEND 优先
+BACKEND: str = str(_g("BACKEND", "auto")).lower()
 AUTO_PASTE_IMAGE: bool = bool(_g("AUTO_PASTE_IMAGE", True))
 AUTO_SEND_IMAGE: bool = bool(_g("AUTO_SEND_IMAGE", True))
 
@@ -37,6 +57,38 @@ ENABLE_WHITELIST: bool = bool(_g("ENABLE_WHITELIST", True))
 # 资源与生成
 BACKGROUND_NUM: int = int(_g("BACKGROUND_NUM", 16))
 
+# 底图合成模式：lazy=按需合成并缓存最近使用的组合；precompute=确认角色时预合成全部组合
+COMPOSITE_MODE: str = str(_g("COMPOSITE_MODE", "lazy")).lower()
+# 按需合成时内存中保留的底图数量（LRU）
+COMPOSITE_CACHE_SIZE: int = max(1, int(_g("COMPOSITE_CACHE_SIZE", 8)))
+# 底图缓存格式：png=体积小但每次加载需解码；raw=未压缩 RGBA，加载几乎无需解码
+CACHE_FORMAT: str = str(_g("CACHE_FORMAT", "png")).lower()
+# 底图解码缓存的内存预算（MB），文本与图片渲染共用，按 LRU 淘汰
+IMAGE_CACHE_MB: int = max(0, int(_g("IMAGE_CACHE_MB", 256)))
+# 字体缓存保留的 (字体, 字号) 数量（LRU）
+FONT_CACHE_SIZE: int = max(1, int(_g("FONT_CACHE_SIZE", 64)))
+# 预合成使用的进程数（0 表示 CPU 核数）
+PRECOMPUTE_WORKERS: int = max(0, int(_g("PRECOMPUTE_WORKERS", 0)))
+# 直接在输出分辨率下排版绘制文字（省去整图缩放；字形由字体在小字号下重新栅格化，与缩放结果略有差异）
+SCALED_RENDER: bool = bool(_g("SCALED_RENDER", False))
+# 以字节形式输出结果时的格式（png/webp/jpeg/dib）；写入剪贴板时始终直接编码为 DIB
+OUTPUT_FORMAT: str = str(_g("OUTPUT_FORMAT", "png")).lower()
+# PNG 压缩级别（0-9，越低越快、文件越大）
+PNG_COMPRESS_LEVEL: int = min(9, max(0, int(_g("PNG_COMPRESS_LEVEL", 6))))
+# WebP/JPEG 质量（1-100）
+OUTPUT_QUALITY: int = min(100, max(1, int(_g("OUTPUT_QUALITY", 90))))
+# 分阶段耗时统计：TUI 状态行显示 p50/p95/max，退出时写入 TRACE_FILE（相对项目根目录）
+TRACE_ENABLED: bool = bool(_g("TRACE_ENABLED", True))
+TRACE_FILE: str = str(_g("TRACE_FILE", "trace.json"))
+# 在 TUI 中切换选择时，后台预热当前组合及相邻表情/背景的底图与角色字体
+PREWARM_ENABLED: bool = bool(_g("PREWARM_ENABLED", True))
+# 渲染结果缓存：重复发送的相同文本直接返回已编码结果（内存/磁盘预算，MB；0 表示关闭该级）
+RESULT_CACHE_MB: int = max(0, int(_g("RESULT_CACHE_MB", 64)))
+RESULT_CACHE_DISK_MB: int = max(0, int(_g("RESULT_CACHE_DISK_MB", 256)))
+# 监视 config/ 与 resource/，新增表情/背景/角色后无需重启即可使用
+WATCH_ENABLED: bool = bool(_g("WATCH_ENABLED", True))
+WATCH_INTERVAL: float = max(0.1, float(_g("WATCH_INTERVAL", 1.0)))  # 轮询间隔（秒）
+
 # 文本区域（像素坐标）
 _tsp = _g("TEXT_ST_POS", (728, 355))
 TEXT_ST_POS: tuple[int, int] = (
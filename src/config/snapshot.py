@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, TypeVar
+
+from .paths import CACHE_DIR, ensure_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Startup snapshot: parsed YAML and directory listings keyed by section, each
+# stored with the mtimes of the paths it was built from. Any process reads it,
+# but only the TUI writes it (``persist()`` from app.main), so importing the
+# config from batch/daemon/bench never touches the disk. Disable with
+# TEXTBOX_STARTUP_SNAPSHOT=0.
+SNAPSHOT_FILE = CACHE_DIR / "startup.json"
+SNAPSHOT_VERSION = 1
+ENABLED = os.getenv("TEXTBOX_STARTUP_SNAPSHOT", "1").lower() not in ("0", "false", "no")
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_sections: Dict[str, Dict[str, Any]] | None = None
+_dirty = False
+
+
+def path_stamp(path: Path) -> List[int] | None:
+    """Return [mtime_ns, size] of a file or directory, or None if it does not exist.
+
+    A directory's mtime changes whenever an entry is added, removed or renamed,
+    which is all a listing depends on.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    global _sections
+    if _sections is None:
+        _sections = {}
+        try:
+            data = json.loads(SNAPSHOT_FILE.read_text(encoding="utf-8"))
+            if data.get("version") == SNAPSHOT_VERSION:
+                _sections = dict(data.get("sections") or {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("启动快照损坏，已忽略: %s", e)
+    return _sections
+
+
+def persist() -> None:
+    """Write sections rebuilt since the snapshot was read; a no-op when nothing changed.
+
+    Failures (e.g. a read-only checkout) are logged and ignored: the next
+    start simply parses the sources again.
+    """
+    global _dirty
+    if not ENABLED:
+        return
+    with _lock:
+        if not _dirty:
+            return
+        data = {"version": SNAPSHOT_VERSION, "sections": _load()}
+        _dirty = False
+        tmp = SNAPSHOT_FILE.with_name(f"{SNAPSHOT_FILE.name}.{os.getpid()}.tmp")
+        try:
+            ensure_cache_dir()
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, SNAPSHOT_FILE)
+        except OSError as e:
+            logger.info("未写入启动快照: %s", e)
+
+
+def cached(section: str, paths: Iterable[Path], build: Callable[[], T]) -> T:
+    """Return the snapshot value of ``section`` if none of ``paths`` changed.
+
+    Otherwise call ``build`` (whose result must be JSON-serializable) and keep
+    it with the current stamps until ``persist()``. Tuples come back as lists.
+    """
+    global _dirty
+    if not ENABLED:
+        return build()
+    stamps = {str(p): path_stamp(p) for p in paths}
+    with _lock:
+        entry = _load().get(section)
+        if entry is not None and entry.get("stamps") == stamps:
+            return entry["value"]
+    value = build()
+    with _lock:
+        _load()[section] = {"stamps": stamps, "value": value}
+        _dirty = True
+    return value
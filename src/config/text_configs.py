@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Dict, List
 
 from .characters import character_meta
+from .registry import LazyMapping
 
 # Dynamic text decoration builder based on character meta (name/color)
 # Keeps existing positions/font_size templates per role; falls back to a default layout.
@@ -123,25 +124,34 @@ def _segments_from_name(name: str) -> List[str]:
     return [s1, s2, s3, s4]
 
 
-# Build text configs dict dynamically
-text_configs_dict: Dict[str, List[Dict]] = {}
+def _build_text_configs() -> Dict[str, List[Dict]]:
+    text_configs: Dict[str, List[Dict]] = {}
+    for cid, meta in character_meta.items():
+        name = meta.get("name") or cid
+        color = tuple(meta.get("color") or WHITE)
+        segments = _segments_from_name(name)
+        template = POS_TEMPLATES.get(cid, FALLBACK_TEMPLATE)
 
-for cid, meta in character_meta.items():
-    name = meta.get("name") or cid
-    color = tuple(meta.get("color") or WHITE)
-    segments = _segments_from_name(name)
-    template = POS_TEMPLATES.get(cid, FALLBACK_TEMPLATE)
+        configs: List[Dict] = []
+        for idx, tpl in enumerate(template):
+            seg_text = segments[idx] if idx < len(segments) else ""
+            seg_color = color if idx == 0 else WHITE
+            configs.append(
+                {
+                    "text": seg_text,
+                    "position": tpl["position"],
+                    "font_color": seg_color,
+                    "font_size": tpl["font_size"],
+                }
+            )
+        text_configs[cid] = configs
+    return text_configs
 
-    configs: List[Dict] = []
-    for idx, tpl in enumerate(template):
-        seg_text = segments[idx] if idx < len(segments) else ""
-        seg_color = color if idx == 0 else WHITE
-        configs.append(
-            {
-                "text": seg_text,
-                "position": tpl["position"],
-                "font_color": seg_color,
-                "font_size": tpl["font_size"],
-            }
-        )
-    text_configs_dict[cid] = configs
+
+# Text configs are built from character meta on first access
+text_configs_dict: LazyMapping[str, List[Dict]] = LazyMapping(_build_text_configs)
+
+
+def reload() -> None:
+    """Rebuild the text configs from the current character meta."""
+    text_configs_dict.reload()
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Bootstrap to support running as a standalone script: `python src/daemon.py`
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+from src.config.settings import OUTPUT_FORMAT
+from src.utils.image_encode import FORMAT_SUFFIXES
+from src.utils.logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# 请求体上限（记录只含文本与图片路径，不上传图片本身）
+MAX_BODY = 1024 * 1024
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "jpg": "image/jpeg",
+    "dib": "image/bmp",
+}
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class _HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class RenderServer:
+    """
+    常驻渲染服务：进程池中的工作进程保持字体、底图缓存常驻。
+    同时渲染数不超过进程数，排队请求超过 max_pending 时直接返回 503（背压）。
+    """
+
+    def __init__(self, workers: int = 0, max_pending: int = 0) -> None:
+        # 只有服务端需要角色配置与渲染代码，客户端保持轻量
+        from src.config.characters import character_list
+        from src.services.jobs import warm_roles
+
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=warm_roles,
+            initargs=(list(character_list),),
+        )
+        self._slots = asyncio.Semaphore(self.workers)
+        self.pending = 0
+        self.served = 0
+        self.failed = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "served": self.served,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "uptime": round(time.time() - self.started, 1),
+        }
+
+    async def render(self, record: dict) -> Tuple[bytes, str]:
+        from src.services.jobs import parse_job, render_job
+
+        if not isinstance(record, dict):
+            raise _HttpError(400, "请求体必须是 JSON 对象")
+        output_format = str(record.get("format") or OUTPUT_FORMAT).lower()
+        if output_format not in CONTENT_TYPES:
+            raise _HttpError(400, f"不支持的输出格式: {output_format}")
+        try:
+            job = parse_job(record)
+        except ValueError as e:
+            raise _HttpError(400, str(e))
+
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise _HttpError(503, "服务繁忙，请稍后重试")
+        self.pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                t0 = time.perf_counter()
+                try:
+                    data = await loop.run_in_executor(
+                        self.executor, render_job, job, output_format, True
+                    )
+                except Exception as e:
+                    self.failed += 1
+                    logger.exception("渲染失败: %s", e)
+                    raise _HttpError(500, f"{type(e).__name__}: {e}")
+                self.served += 1
+                logger.info(
+                    "渲染完成: role=%s %d bytes %.1f ms (排队 %d)",
+                    job.role,
+                    len(data),
+                    (time.perf_counter() - t0) * 1000,
+                    self.pending - 1,
+                )
+                return data, CONTENT_TYPES[output_format]
+        finally:
+            self.pending -= 1
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            try:
+                status, body, ctype = 200, *await self._dispatch(reader)
+            except _HttpError as e:
+                status, ctype = e.status, "application/json"
+                body = json.dumps({"error": str(e)}, ensure_ascii=False).encode()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                raise
+            except Exception as e:
+                # 未预料的错误也要回应客户端，而不是直接断开连接
+                logger.exception("处理请求失败: %s", e)
+                status, ctype = 500, "application/json"
+                body = json.dumps(
+                    {"error": f"{type(e).__name__}: {e}"}, ensure_ascii=False
+                ).encode()
+            head = [
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                f"Content-Type: {ctype}",
+                f"Content-Length: {len(body)}",
+                "Connection: close",
+            ]
+            if status == 503:
+                head.append("Retry-After: 1")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader: asyncio.StreamReader) -> Tuple[bytes, str]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise _HttpError(400, "无效的请求")
+        method, path = request_line[0].upper(), request_line[1]
+        headers: Dict[str, str] = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if path == "/health":
+            body = json.dumps(self.stats()).encode()
+            return body, "application/json"
+        if path != "/render":
+            raise _HttpError(404, f"未知路径: {path}")
+        if method != "POST":
+            raise _HttpError(405, "请使用 POST")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise _HttpError(400, "无效的 Content-Length")
+        if length < 0:
+            raise _HttpError(400, "无效的 Content-Length")
+        if length > MAX_BODY:
+            raise _HttpError(413, "请求体过大")
+        try:
+            record = json.loads((await reader.readexactly(length)).decode("utf-8"))
+        except UnicodeDecodeError:
+            raise _HttpError(400, "请求体不是有效的 UTF-8")
+        except json.JSONDecodeError as e:
+            raise _HttpError(400, f"无效的 JSON: {e}")
+        return await self.render(record)
+
+
+async def serve(host: str, port: int, workers: int, max_pending: int) -> None:
+    server = RenderServer(workers, max_pending)
+    tcp = await asyncio.start_server(server.handle, host, port)
+    logger.info(
+        "渲染服务已启动: http://%s:%d (工作进程 %d，排队上限 %d)",
+        host,
+        port,
+        server.workers,
+        server.max_pending,
+    )
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        server.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _post(url: str, record: dict, retries: int = 20) -> bytes:
+    data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+    delay = 0.05
+    for _ in range(retries):
+        req = urllib.request.Request(
+            url, data=data, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(req) as resp:
+                return resp.read()
+        except urllib.error.HTTPError as e:
+            if e.code != 503:
+                raise RuntimeError(e.read().decode("utf-8", "replace")) from None
+        # 服务端背压：退避后重试
+        time.sleep(delay)
+        delay = min(1.0, delay * 2)
+    raise RuntimeError("服务持续繁忙，放弃")
+
+
+def submit(
+    url: str, records: List[dict], out_dir: Path, concurrency: int
+) -> Tuple[int, int]:
+    """将记录逐条提交给渲染服务并把结果写入 out_dir，返回 (成功数, 失败数)。"""
+    from src.services.jobs import check_output_name
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def one(item: Tuple[int, dict]) -> bool:
+        index, record = item
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("记录必须是 JSON 对象")
+            fmt = str(record.get("format") or OUTPUT_FORMAT).lower()
+            # 写入路径由记录决定：不依赖服务端先行拒绝非法文件名
+            stem = check_output_name(
+                str(record.get("name") or f"{index:06d}_{record.get('role')}")
+            )
+            name = f"{stem}{FORMAT_SUFFIXES.get(fmt, '.' + fmt)}"
+            (out_dir / name).write_bytes(_post(url, record))
+            return True
+        except Exception as e:
+            logger.error("第 %d 条失败: %s", index, e)
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(one, enumerate(records, start=1)))
+    return sum(results), len(results) - sum(results)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.daemon", description="常驻渲染服务与客户端"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="启动渲染服务（仅监听本机）")
+    p_serve.add_argument("--host", default=DEFAULT_HOST)
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument(
+        "-j", "--workers", type=int, default=0, help="工作进程数（0 表示 CPU 核数）"
+    )
+    p_serve.add_argument(
+        "--max-pending",
+        type=int,
+        default=0,
+        help="排队请求上限，超过时返回 503（0 表示进程数的 4 倍）",
+    )
+
+    p_submit = sub.add_parser("submit", help="提交 JSONL 任务并保存结果")
+    p_submit.add_argument("jobs", help="JSONL 任务文件，- 表示标准输入")
+    p_submit.add_argument("-o", "--out-dir", type=Path, required=True)
+    p_submit.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    p_submit.add_argument("-c", "--concurrency", type=int, default=4)
+
+    args = parser.parse_args(argv)
+    # 单独的日志文件：不覆盖正在运行的 TUI 所写的 log.txt
+    setup_logging("daemon.log")
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.workers, args.max_pending))
+        except KeyboardInterrupt:
+            logger.info("渲染服务已停止")
+        return 0
+
+    stream = sys.stdin if args.jobs == "-" else open(args.jobs, encoding="utf-8")
+    with stream:
+        records = [json.loads(line) for line in stream if line.strip()]
+    start = time.perf_counter()
+    ok, failed = submit(
+        args.url.rstrip("/") + "/render", records, args.out_dir, args.concurrency
+    )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "提交完成: 成功 %d，失败 %d，用时 %.2fs，%.1f 张/秒",
+        ok,
+        failed,
+        elapsed,
+        ok / elapsed if elapsed > 0 else 0.0,
+    )
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
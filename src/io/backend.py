@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from ..config.settings import BACKEND, CUT_HOTKEY, PASTE_HOTKEY, SELECT_ALL_HOTKEY
+
+logger = logging.getLogger(__name__)
+
+
+class Backend(ABC):
+    """
+    平台相关操作的统一接口：按键发送与全局热键、剪贴板读写、前台窗口进程名。
+    io.clipboard / io.keys / io.window 只通过当前后端访问系统。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def send(self, hotkey: str) -> None:
+        """向前台程序发送按键组合，如 "ctrl+v"。"""
+
+    @abstractmethod
+    def add_hotkey(
+        self, hotkey: str, callback: Callable[[], None], suppress: bool = False
+    ) -> None:
+        """注册全局热键；suppress 为真时按键不再传给前台程序。"""
+
+    @abstractmethod
+    def get_text(self) -> str:
+        """读取剪贴板中的文本。"""
+
+    @abstractmethod
+    def set_text(self, text: str) -> None:
+        """清空剪贴板并写入文本。"""
+
+    @abstractmethod
+    def get_dib(self) -> Optional[bytes]:
+        """读取剪贴板中的 CF_DIB 数据，没有图像或无法打开剪贴板时返回 None。"""
+
+    @abstractmethod
+    def set_dib(self, dib_data: bytes) -> bool:
+        """清空剪贴板并写入 CF_DIB 数据，返回是否写入成功。"""
+
+    @abstractmethod
+    def sequence_number(self) -> int:
+        """剪贴板序列号，内容每次变化时递增。"""
+
+    @abstractmethod
+    def clipboard_busy(self) -> bool:
+        """剪贴板是否正被其他程序打开。"""
+
+    @abstractmethod
+    def foreground_exe_name(self) -> str | None:
+        """前台窗口所属进程的可执行文件名，获取失败时返回 None。"""
+
+
+class WindowsBackend(Backend):
+    """Windows 实现：keyboard / pyperclip / pywin32 / psutil，在创建后端时才导入。"""
+
+    name = "windows"
+
+    def __init__(self) -> None:
+        import keyboard
+        import psutil
+        import pyperclip
+        from win32 import win32clipboard, win32gui, win32process
+
+        self._keyboard = keyboard
+        self._psutil = psutil
+        self._pyperclip = pyperclip
+        self._clip = win32clipboard
+        self._gui = win32gui
+        self._process = win32process
+
+    def _open_clipboard_with_retry(
+        self, retries: int = 15, delay: float = 0.08
+    ) -> bool:
+        """Try to open the clipboard with retry/backoff to avoid ERROR_ACCESS_DENIED (5)."""
+        for _ in range(max(1, retries)):
+            try:
+                self._clip.OpenClipboard()
+                return True
+            except Exception:
+                time.sleep(delay)
+        return False
+
+    def _close_clipboard(self) -> None:
+        try:
+            self._clip.CloseClipboard()
+        except Exception:
+            pass
+
+    def send(self, hotkey: str) -> None:
+        self._keyboard.send(hotkey)
+
+    def add_hotkey(
+        self, hotkey: str, callback: Callable[[], None], suppress: bool = False
+    ) -> None:
+        self._keyboard.add_hotkey(hotkey, callback, suppress=suppress)
+
+    def get_text(self) -> str:
+        return self._pyperclip.paste()
+
+    def set_text(self, text: str) -> None:
+        self._pyperclip.copy(text)
+
+    def get_dib(self) -> Optional[bytes]:
+        if not self._open_clipboard_with_retry():
+            logger.warning("无法从剪贴板获取图像：剪贴板正被占用")
+            return None
+        try:
+            if self._clip.IsClipboardFormatAvailable(self._clip.CF_DIB):
+                return self._clip.GetClipboardData(self._clip.CF_DIB) or None
+        except Exception as e:
+            logger.warning("无法从剪贴板获取图像: %s", e)
+        finally:
+            self._close_clipboard()
+        return None
+
+    def set_dib(self, dib_data: bytes) -> bool:
+        if not self._open_clipboard_with_retry():
+            logger.warning("无法打开剪贴板以写入数据（被占用）")
+            return False
+        try:
+            self._clip.EmptyClipboard()
+            self._clip.SetClipboardData(self._clip.CF_DIB, dib_data)
+            return True
+        finally:
+            self._close_clipboard()
+
+    def sequence_number(self) -> int:
+        return self._clip.GetClipboardSequenceNumber()
+
+    def clipboard_busy(self) -> bool:
+        return bool(self._clip.GetOpenClipboardWindow())
+
+    def foreground_exe_name(self) -> str | None:
+        try:
+            hwnd = self._gui.GetForegroundWindow()
+            _, pid = self._process.GetWindowThreadProcessId(hwnd)
+            return Path(self._psutil.Process(pid).exe()).name
+        except Exception as e:
+            logger.warning("获取前台窗口进程名失败: %s", e)
+            return None
+
+
+class MemoryBackend(Backend):
+    """
+    内存实现，用于无界面的 Linux 构建/基准机：模拟一个前台输入框与剪贴板。
+    全选 + 剪切把 input_text / input_dib 移入剪贴板（延迟 cut_latency 秒后生效），
+    粘贴把剪贴板内容记入 pasted，目标程序在 paste_latency 秒内占用剪贴板；
+    所有按键记入 keys，trigger() 模拟按下已注册的全局热键。
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        *,
+        foreground: str | None = "WeChat.exe",
+        cut_latency: float = 0.0,
+        paste_latency: float = 0.0,
+    ) -> None:
+        self.foreground = foreground
+        self.cut_latency = cut_latency
+        self.paste_latency = paste_latency
+        self.input_text = ""
+        self.input_dib: Optional[bytes] = None
+        self.keys: List[str] = []
+        self.pasted: List[Tuple[str, Optional[bytes]]] = []
+        self.hotkeys: Dict[str, Tuple[Callable[[], None], bool]] = {}
+        self._text = ""
+        self._dib: Optional[bytes] = None
+        self._seq = 0
+        self._selected = False
+        # 粘贴后目标程序读取剪贴板：(截止时间, 是否已被观察到)
+        self._reading: Tuple[float, bool] | None = None
+        self._lock = threading.RLock()
+
+    def _set_clipboard(self, text: str, dib: Optional[bytes]) -> None:
+        with self._lock:
+            self._text, self._dib = text, dib
+            self._seq += 1
+
+    def _cut(self) -> None:
+        with self._lock:
+            text, dib = self.input_text, self.input_dib
+            self.input_text, self.input_dib = "", None
+        if self.cut_latency > 0:
+            timer = threading.Timer(self.cut_latency, self._set_clipboard, (text, dib))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._set_clipboard(text, dib)
+
+    def send(self, hotkey: str) -> None:
+        with self._lock:
+            self.keys.append(hotkey)
+            if hotkey == SELECT_ALL_HOTKEY:
+                self._selected = True
+                return
+            if hotkey == CUT_HOTKEY:
+                selected, self._selected = self._selected, False
+                if selected:
+                    self._cut()
+                return
+            self._selected = False
+            if hotkey == PASTE_HOTKEY:
+                self.pasted.append((self._text, self._dib))
+                self._reading = (time.perf_counter() + self.paste_latency, False)
+
+    def add_hotkey(
+        self, hotkey: str, callback: Callable[[], None], suppress: bool = False
+    ) -> None:
+        self.hotkeys[hotkey] = (callback, suppress)
+
+    def trigger(self, hotkey: str) -> None:
+        """模拟用户按下 hotkey：调用已注册的回调，未注册或不抑制时按键同时到达前台程序。"""
+        callback, suppress = self.hotkeys.get(hotkey, (None, False))
+        if not suppress:
+            with self._lock:
+                self.keys.append(hotkey)
+        if callback is not None:
+            callback()
+
+    def get_text(self) -> str:
+        with self._lock:
+            return self._text
+
+    def set_text(self, text: str) -> None:
+        self._set_clipboard(text, None)
+
+    def get_dib(self) -> Optional[bytes]:
+        with self._lock:
+            return self._dib
+
+    def set_dib(self, dib_data: bytes) -> bool:
+        self._set_clipboard("", dib_data)
+        return True
+
+    def sequence_number(self) -> int:
+        with self._lock:
+            return self._seq
+
+    def clipboard_busy(self) -> bool:
+        with self._lock:
+            if self._reading is None:
+                return False
+            deadline, seen = self._reading
+            if not seen or time.perf_counter() < deadline:
+                # 粘贴后的第一次查询总能看到目标程序打开着剪贴板
+                self._reading = (deadline, True)
+                return True
+            self._reading = None
+            return False
+
+    def foreground_exe_name(self) -> str | None:
+        return self.foreground
+
+
+_BACKENDS: Dict[str, Type[Backend]] = {
+    WindowsBackend.name: WindowsBackend,
+    MemoryBackend.name: MemoryBackend,
+}
+_backend: Backend | None = None
+_backend_lock = threading.Lock()
+
+
+def register_backend(name: str, cls: Type[Backend]) -> None:
+    _BACKENDS[name.lower()] = cls
+
+
+def _configured_name() -> str:
+    name = os.getenv("TEXTBOX_BACKEND", BACKEND).lower()
+    if name == "auto":
+        return "windows" if sys.platform == "win32" else "memory"
+    return name
+
+
+def get_backend() -> Backend:
+    """返回当前后端；首次调用时按 TEXTBOX_BACKEND 环境变量或 BACKEND 设置创建。"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = _configured_name()
+                cls = _BACKENDS.get(name)
+                if cls is None:
+                    raise ValueError(f"未知的平台后端: {name}")
+                _backend = cls()
+                logger.info("平台后端: %s", name)
+    return _backend
+
+
+def set_backend(backend: Backend) -> Backend:
+    """替换当前后端（如基准中安装预先编排好的 MemoryBackend），返回该后端。"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    logger.info("平台后端: %s", backend.name)
+    return backend
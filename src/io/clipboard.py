@@ -1,86 +1,127 @@
 from __future__ import annotations
 
 import io
+import logging
 import time
 from typing import Optional, Tuple
 
-import pyperclip
 from PIL import Image
-from win32 import win32clipboard
 
+from .backend import get_backend
 from .keys import send
-from ..config.settings import CUT_HOTKEY, DELAY, SELECT_ALL_HOTKEY
+from ..config.settings import (
+    CLIPBOARD_POLL_INTERVAL,
+    CLIPBOARD_SETTLE,
+    CUT_HOTKEY,
+    DELAY,
+    PASTE_SETTLE,
+    PASTE_TIMEOUT,
+    SELECT_ALL_HOTKEY,
+)
+from ..utils.clipboard_wait import wait_for_change, wait_for_release
+from ..utils.image_encode import encode_dib
 
+logger = logging.getLogger(__name__)
 
-def _open_clipboard_with_retry(retries: int = 15, delay: float = 0.08) -> bool:
-    """Try to open the clipboard with retry/backoff to avoid ERROR_ACCESS_DENIED (5)."""
-    for _ in range(max(1, retries)):
-        try:
-            win32clipboard.OpenClipboard()
-            return True
-        except Exception:
-            time.sleep(delay)
-    return False
+
+def _dib_to_image(dib_data: bytes) -> Image.Image:
+    # CF_DIB 不含 BITMAPFILEHEADER，补上后交给 Pillow 按 BMP 解码
+    header = (
+        b"BM"
+        + (len(dib_data) + 14).to_bytes(4, "little")
+        + b"\x00\x00\x00\x00\x36\x00\x00\x00"
+    )
+    return Image.open(io.BytesIO(header + dib_data))
+
+
+def get_sequence_number() -> int:
+    """剪贴板序列号：内容每变化一次加一，读取无需打开剪贴板。"""
+    return get_backend().sequence_number()
+
+
+def wait_for_cut(seq_before: int) -> bool:
+    """
+    等待剪切结果写入剪贴板：轮询序列号直到变化并稳定 CLIPBOARD_SETTLE 秒，
+    最长等待 max(0.12, DELAY) 秒。返回是否观察到变化。
+    """
+    result = wait_for_change(
+        get_sequence_number,
+        seq_before,
+        interval=CLIPBOARD_POLL_INTERVAL,
+        timeout=max(0.12, DELAY),
+        settle=CLIPBOARD_SETTLE,
+    )
+    if result.changed:
+        logger.info("剪切已写入剪贴板，等待 %.1f ms", result.waited * 1000)
+    else:
+        logger.info("等待剪切超时（%.1f ms），剪贴板未变化", result.waited * 1000)
+    return result.changed
+
+
+def wait_for_paste() -> bool:
+    """
+    粘贴不会改变剪贴板内容，因此等待目标程序打开并关闭剪贴板（读取完毕），
+    再等待 PASTE_SETTLE 秒让其插入内容；未观察到读取时最多等待 PASTE_TIMEOUT 秒。
+    返回是否观察到读取。
+    """
+    result = wait_for_release(
+        get_backend().clipboard_busy,
+        interval=CLIPBOARD_POLL_INTERVAL / 2,
+        timeout=PASTE_TIMEOUT,
+    )
+    if result.changed:
+        time.sleep(PASTE_SETTLE)
+        logger.info(
+            "目标程序已读取剪贴板，等待 %.1f ms",
+            (result.waited + PASTE_SETTLE) * 1000,
+        )
+    else:
+        logger.info("未观察到目标程序读取剪贴板，已等待 %.1f ms", result.waited * 1000)
+    return result.changed
+
+
+def copy_dib_to_clipboard(dib_data: bytes) -> None:
+    """将已编码的 CF_DIB 数据写入剪贴板（见 utils.image_encode.encode_dib）。"""
+    get_backend().set_dib(dib_data)
+
+
+def copy_image_to_clipboard(image: Image.Image) -> int:
+    """将渲染结果直接编码为 DIB 写入剪贴板，返回写入的字节数。"""
+    dib_data = encode_dib(image)
+    copy_dib_to_clipboard(dib_data)
+    return len(dib_data)
 
 
 def copy_png_bytes_to_clipboard(png_bytes: bytes) -> None:
     """将 PNG 字节写入剪贴板（以 DIB/BMP 方式）。"""
-    image = Image.open(io.BytesIO(png_bytes))
-    with io.BytesIO() as output:
-        image.convert("RGB").save(output, "BMP")
-        bmp_data = output.getvalue()[14:]
-
-    if not _open_clipboard_with_retry():
-        print("无法打开剪贴板以写入数据（被占用）。")
-        return
-    try:
-        win32clipboard.EmptyClipboard()
-        win32clipboard.SetClipboardData(win32clipboard.CF_DIB, bmp_data)
-    finally:
-        try:
-            win32clipboard.CloseClipboard()
-        except Exception:
-            pass
+    copy_image_to_clipboard(Image.open(io.BytesIO(png_bytes)))
 
 
 def cut_all_and_get_text() -> str:
     """模拟 Ctrl+A / Ctrl+X 剪切全部文本，并返回剪切得到的内容。会还原剪贴板。"""
-    old_clip = pyperclip.paste()
-    pyperclip.copy("")
+    backend = get_backend()
+    old_clip = backend.get_text()
+    backend.set_text("")
+    seq = get_sequence_number()
 
     send(SELECT_ALL_HOTKEY)
     send(CUT_HOTKEY)
-    time.sleep(max(0.12, DELAY))  # 稍微放大以避免剪贴板竞争
+    wait_for_cut(seq)
 
-    new_clip = pyperclip.paste()
-    pyperclip.copy(old_clip)
+    new_clip = backend.get_text()
+    backend.set_text(old_clip)
     return new_clip
 
 
 def try_get_image() -> Optional[Image.Image]:
-    """尝试从剪贴板获取图像，如果没有图像则返回 None（仅支持 Windows）。"""
-    if not _open_clipboard_with_retry():
-        print("无法从剪贴板获取图像：剪贴板正被占用")
+    """尝试从剪贴板获取图像，如果没有图像则返回 None。"""
+    data = get_backend().get_dib()
+    if not data:
         return None
     try:
-        if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_DIB):
-            data = win32clipboard.GetClipboardData(win32clipboard.CF_DIB)
-            if data:
-                bmp_data = data
-                header = (
-                    b"BM"
-                    + (len(bmp_data) + 14).to_bytes(4, "little")
-                    + b"\x00\x00\x00\x00\x36\x00\x00\x00"
-                )
-                image = Image.open(io.BytesIO(header + bmp_data))
-                return image
+        return _dib_to_image(data)
     except Exception as e:
         print("无法从剪贴板获取图像：", e)
-    finally:
-        try:
-            win32clipboard.CloseClipboard()
-        except Exception:
-            pass
     return None
 
 
@@ -89,43 +130,33 @@ def cut_all_capture() -> Tuple[str, Optional[Image.Image]]:
     剪切前台输入框的全部内容并捕获剪贴板当前内容（文本或图像），不恢复原剪贴板。
     返回: (text, image)，二者至少一个有值；若都无，则均为空/None。
     """
+    backend = get_backend()
     # 清空文本通道，避免读到旧文本
     try:
-        pyperclip.copy("")
+        backend.set_text("")
     except Exception:
         pass
+    # 清空之后再取序列号，剪切写入剪贴板时它会变化
+    seq = get_sequence_number()
 
-    # 发送 Ctrl+A / Ctrl+X
+    # 发送 Ctrl+A / Ctrl+X，等待剪贴板变化而不是固定等待
     send(SELECT_ALL_HOTKEY)
     send(CUT_HOTKEY)
-    time.sleep(max(0.12, DELAY))
+    wait_for_cut(seq)
 
     # 优先尝试图像
     image = None
-    if _open_clipboard_with_retry():
-        try:
-            if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_DIB):
-                data = win32clipboard.GetClipboardData(win32clipboard.CF_DIB)
-                if data:
-                    bmp_data = data
-                    header = (
-                        b"BM"
-                        + (len(bmp_data) + 14).to_bytes(4, "little")
-                        + b"\x00\x00\x00\x00\x36\x00\x00\x00"
-                    )
-                    image = Image.open(io.BytesIO(header + bmp_data))
-        except Exception:
-            image = None
-        finally:
-            try:
-                win32clipboard.CloseClipboard()
-            except Exception:
-                pass
+    try:
+        data = backend.get_dib()
+        if data:
+            image = _dib_to_image(data)
+    except Exception:
+        image = None
 
     # 再读取文本
     text = ""
     try:
-        text = pyperclip.paste() or ""
+        text = backend.get_text() or ""
     except Exception:
         text = ""
 
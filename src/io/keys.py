@@ -1,7 +1,15 @@
 from __future__ import annotations
 
-import keyboard
+from typing import Callable
+
+from .backend import get_backend
 
 
 def send(hotkey: str) -> None:
-    keyboard.send(hotkey)
+    get_backend().send(hotkey)
+
+
+def add_hotkey(
+    hotkey: str, callback: Callable[[], None], suppress: bool = False
+) -> None:
+    get_backend().add_hotkey(hotkey, callback, suppress=suppress)
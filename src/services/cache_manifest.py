@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+from ..config.paths import CACHE_DIR, ensure_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# 缓存清单：记录每张合成底图的源文件指纹与叠加偏移，用于增量失效
+MANIFEST_FILE = CACHE_DIR / "manifest.json"
+MANIFEST_VERSION = 1
+
+_lock = threading.Lock()
+_entries: Dict[str, Dict[str, Any]] | None = None
+
+
+def file_fingerprint(path: Path) -> list[int] | None:
+    """Return [mtime_ns, size] of the file, or None if it does not exist."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    global _entries
+    if _entries is None:
+        _entries = {}
+        if MANIFEST_FILE.is_file():
+            try:
+                data = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+                if data.get("version") == MANIFEST_VERSION:
+                    _entries = dict(data.get("entries") or {})
+            except Exception as e:
+                logger.warning("缓存清单损坏，已忽略: %s", e)
+    return _entries
+
+
+def get_entry(name: str) -> Dict[str, Any] | None:
+    with _lock:
+        return _load().get(name)
+
+
+def is_fresh(name: str, expected: Dict[str, Any]) -> bool:
+    """True if the cache file exists and was built from exactly ``expected``."""
+    if not (CACHE_DIR / name).is_file():
+        return False
+    return get_entry(name) == expected
+
+
+def record(name: str, entry: Dict[str, Any], *, save: bool = True) -> None:
+    with _lock:
+        _load()[name] = entry
+    if save:
+        save_manifest()
+
+
+def remove(name: str, *, save: bool = True) -> None:
+    with _lock:
+        _load().pop(name, None)
+    if save:
+        save_manifest()
+
+
+def entries() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        return dict(_load())
+
+
+def save_manifest() -> None:
+    with _lock:
+        data = {"version": MANIFEST_VERSION, "entries": _load()}
+        tmp = MANIFEST_FILE.with_name(MANIFEST_FILE.name + ".tmp")
+        ensure_cache_dir()
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, MANIFEST_FILE)
+
+
+def clear_manifest() -> None:
+    global _entries
+    with _lock:
+        _entries = {}
+        try:
+            MANIFEST_FILE.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Tuple
+
+from .generator import Selection
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationQueue:
+    """
+    Run generations on a dedicated worker thread instead of the keyboard hook.
+
+    ``submit`` only records the selection snapshot and returns. At most one job
+    waits behind the running one: a newer trigger replaces the waiting job, and
+    a trigger identical to the waiting job is dropped as a duplicate.
+    ``run`` receives the snapshot and the time it waited in the queue (ms).
+    """
+
+    def __init__(self, run: Callable[[Selection, float], str | None]) -> None:
+        self._run = run
+        self._cond = threading.Condition()
+        self._pending: Tuple[Selection, float] | None = None
+        self._busy = False
+        self.submitted = 0
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._worker, name="generation", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        """Jobs running or waiting."""
+        with self._cond:
+            return int(self._busy) + (self._pending is not None)
+
+    def submit(self, selection: Selection) -> None:
+        with self._cond:
+            self.submitted += 1
+            if self._pending is not None:
+                self.dropped += 1
+                if self._pending[0] == selection:
+                    logger.info("忽略重复的生成触发（已有相同任务排队）")
+                    return
+                logger.info("合并生成触发：以最新选择替换排队中的任务")
+            self._pending = (selection, time.perf_counter())
+            logger.info("生成任务入队: depth=%d", int(self._busy) + 1)
+            self._cond.notify()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                selection, queued_at = self._pending
+                self._pending = None
+                self._busy = True
+            wait_ms = (time.perf_counter() - queued_at) * 1000
+            logger.info(
+                "开始处理生成任务: 排队 %.1f ms, role=%s expr=%s bg=%s",
+                wait_ms,
+                selection.character_name,
+                selection.expr_name,
+                selection.bg_name,
+            )
+            try:
+                msg = self._run(selection, wait_ms)
+                if msg:
+                    logger.info("生成任务结束: %s", msg)
+            except Exception as e:
+                logger.exception("生成任务异常: %s", e)
+            finally:
+                with self._cond:
+                    self._busy = False
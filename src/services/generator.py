@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from dataclasses import dataclass, field
-from typing import List, Set, Tuple
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Set, Tuple
 
 from PIL import Image
 
@@ -9,10 +16,39 @@ from ..config.characters import character_list, characters
 from ..config.paths import (
     BACKGROUND_DIR,
     CACHE_DIR,
+    CACHE_SUFFIXES,
     CHARACTER_DIR,
     cache_file,
+    compose_name,
+    ensure_cache_dir,
     get_background_files,
+    iter_cache_files,
 )
+from ..config.settings import (
+    COMPOSITE_CACHE_SIZE,
+    COMPOSITE_MODE,
+    PRECOMPUTE_WORKERS,
+)
+from ..utils.image_cache import decoded_images, get_decoded_image, put_decoded_image
+from ..utils.raw_image import save_base
+from . import cache_manifest
+from .result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+# 表情立绘粘贴到背景上的位置
+OVERLAY_OFFSET: Tuple[int, int] = (0, 134)
+
+# 预合成期间写入清单的最长间隔（秒）：进程被中断时最多丢失这段时间内完成的记录
+MANIFEST_SAVE_INTERVAL = 1.0
+
+# 按需合成的底图（LRU），键为 (角色, 表情, 背景)，值为 (清单条目, 底图)
+_COMPOSITE_LRU: "OrderedDict[Tuple[str, str, str], Tuple[dict, Image.Image]]" = (
+    OrderedDict()
+)
+# 生成线程与后台预热线程共用 LRU；同一组合同时只合成一次，后到者等待结果
+_lru_lock = threading.Lock()
+_building: Dict[Tuple[str, str, str], threading.Lock] = {}
 
 
 @dataclass
@@ -25,6 +61,39 @@ class State:
     # Roles confirmed (preloaded)
     confirmed_roles: Set[str] = field(default_factory=set)
 
+    # Guards the fields above: the TUI thread mutates them while the hotkey
+    # thread and background jobs read them
+    lock: threading.RLock = field(
+        default_factory=threading.RLock, repr=False, compare=False
+    )
+
+
+@dataclass(frozen=True)
+class Selection:
+    """Immutable snapshot of what a generation should use."""
+
+    character_name: str
+    expr_name: str
+    bg_name: str
+    confirmed: bool
+
+
+def snapshot_selection(state: State) -> Selection:
+    with state.lock:
+        character_name = get_current_character(state)
+        expr_name, bg_name = get_selection(state)
+        return Selection(
+            character_name,
+            expr_name,
+            bg_name,
+            character_name in state.confirmed_roles,
+        )
+
+
+def mark_confirmed(state: State, character_name: str) -> None:
+    with state.lock:
+        state.confirmed_roles.add(character_name)
+
 
 def get_current_character(state: State) -> str:
     return character_list[state.selected_role_index]
@@ -59,83 +128,458 @@ def get_current_background_name(state: State) -> str:
     return files[idx]
 
 
+def restore_selection(state: State, selection: Selection) -> None:
+    """
+    Point the state at the same role, expression and background by name after
+    the registries were reloaded; indices of removed entries are clamped.
+    """
+    with state.lock:
+        if selection.character_name in character_list:
+            state.selected_role_index = character_list.index(selection.character_name)
+        else:
+            last = max(0, len(character_list) - 1)
+            state.selected_role_index = min(state.selected_role_index, last)
+            state.selected_expr_index = 0
+        exprs = get_current_expression_files(state)
+        if selection.expr_name in exprs:
+            state.selected_expr_index = exprs.index(selection.expr_name)
+        backgrounds = get_background_files()
+        if selection.bg_name in backgrounds:
+            state.selected_bg_index = backgrounds.index(selection.bg_name)
+        state.confirmed_roles &= set(character_list)
+
+
 def show_current_character(state: State) -> None:
     print(f"当前角色: {get_current_character(state)}")
 
 
 def set_role(state: State, new_index: int) -> None:
     if 0 <= new_index < len(character_list):
-        state.selected_role_index = new_index
-        # Reset expression index when switching role
-        state.selected_expr_index = 0
+        with state.lock:
+            state.selected_role_index = new_index
+            # Reset expression index when switching role
+            state.selected_expr_index = 0
 
 
 def adjust_expr(state: State, delta: int) -> None:
-    files = get_current_expression_files(state)
-    if not files:
-        state.selected_expr_index = 0
-        return
-    total = len(files)
-    cur = state.selected_expr_index
-    cur = (cur + delta) % total
-    state.selected_expr_index = cur
+    with state.lock:
+        files = get_current_expression_files(state)
+        if not files:
+            state.selected_expr_index = 0
+            return
+        total = len(files)
+        cur = state.selected_expr_index
+        cur = (cur + delta) % total
+        state.selected_expr_index = cur
 
 
 def adjust_bg(state: State, delta: int) -> None:
-    files = get_current_background_files()
-    if not files:
-        state.selected_bg_index = 0
-        return
-    total = len(files)
-    cur = state.selected_bg_index
-    cur = (cur + delta) % total
-    state.selected_bg_index = cur
+    with state.lock:
+        files = get_current_background_files()
+        if not files:
+            state.selected_bg_index = 0
+            return
+        total = len(files)
+        cur = state.selected_bg_index
+        cur = (cur + delta) % total
+        state.selected_bg_index = cur
 
 
 def ensure_character_prepared(character_name: str) -> None:
-    # 若缓存中已有该角色文件前缀，视为已生成
-    if any(
-        p.name.startswith(f"{character_name}_")
-        for p in CACHE_DIR.glob(f"{character_name}_*.png")
-    ):
+    # 按需合成模式下无需预合成，底图在首次使用时生成
+    if COMPOSITE_MODE == "lazy":
+        return
+    # 仅当所有组合都与清单中的源文件指纹一致时视为已生成（只重建过期或缺失的组合）
+    if not stale_pairs(character_name):
         return
     generate_and_save_images(character_name)
 
 
-def generate_and_save_images(character_name: str) -> None:
+def _manifest_entry(character_name: str, expr_name: str, bg_name: str) -> dict | None:
+    """Describe what a composite is built from; None if a source file is missing."""
+    bg_fp = cache_manifest.file_fingerprint(BACKGROUND_DIR / f"{bg_name}.png")
+    expr_fp = cache_manifest.file_fingerprint(
+        CHARACTER_DIR / character_name / f"{expr_name}.png"
+    )
+    if bg_fp is None or expr_fp is None:
+        return None
+    return {
+        "key": [character_name, expr_name, bg_name],
+        "sources": {"background": bg_fp, "expression": expr_fp},
+        "offset": list(OVERLAY_OFFSET),
+    }
+
+
+def stale_pairs(
+    character_name: str, candidates: Iterable[Tuple[str, str]] | None = None
+) -> List[Tuple[str, str]]:
+    """
+    Return (expression, background) pairs of the role that are missing or out of date.
+    ``candidates`` restricts the check to the given pairs (default: all pairs).
+    """
+    if candidates is None:
+        expr_files = characters.get(character_name, {}).get("expression_files", [])
+        candidates = [(e, b) for b in get_background_files() for e in expr_files]
+    pairs: List[Tuple[str, str]] = []
+    for expr_name, bg_name in candidates:
+        entry = _manifest_entry(character_name, expr_name, bg_name)
+        if entry is None:
+            continue
+        name = cache_file(character_name, expr_name, bg_name).name
+        if not cache_manifest.is_fresh(name, entry):
+            pairs.append((expr_name, bg_name))
+    return pairs
+
+
+def _cache_names() -> Dict[str, Tuple[str, str, str]]:
+    """Map every current cache file name back to its (role, expression, background)."""
+    names: Dict[str, Tuple[str, str, str]] = {}
+    bg_files = get_background_files()
+    for role in character_list:
+        for expr_name in characters.get(role, {}).get("expression_files", []):
+            for bg_name in bg_files:
+                names[cache_file(role, expr_name, bg_name).name] = (
+                    role,
+                    expr_name,
+                    bg_name,
+                )
+    return names
+
+
+def _adopt(path: Path, key: Tuple[str, str, str] | None) -> dict | None:
+    """
+    Record an unlisted cache file in the manifest if it is newer than its
+    sources, e.g. a composite finished just before the process was killed.
+    """
+    entry = _manifest_entry(*key) if key else None
+    if entry is None:
+        return None
+    built = cache_manifest.file_fingerprint(path)
+    if built is None or any(built[0] < fp[0] for fp in entry["sources"].values()):
+        return None
+    cache_manifest.record(path.name, entry, save=False)
+    return entry
+
+
+def prune_stale_cache() -> int:
+    """
+    Remove cached composites whose sources changed or vanished. Files the
+    manifest does not know about are adopted if they are newer than their
+    sources and removed otherwise. Removed files are rebuilt on confirm or on
+    first use. Returns the number of removed files.
+    """
+    known = cache_manifest.entries()
+    names: Dict[str, Tuple[str, str, str]] | None = None
+    removed = adopted = 0
+    for p in iter_cache_files():
+        entry = known.get(p.name)
+        if entry is None:
+            if names is None:
+                names = _cache_names()
+            entry = _adopt(p, names.get(p.name))
+            if entry is not None:
+                adopted += 1
+                continue
+        expected = _manifest_entry(*entry["key"]) if entry else None
+        # 切换 CACHE_FORMAT 后旧格式文件同样视为过期
+        if (
+            entry is not None
+            and entry == expected
+            and cache_file(*entry["key"]).name == p.name
+        ):
+            continue
+        try:
+            p.unlink()
+            removed += 1
+        except OSError:
+            continue
+        cache_manifest.remove(p.name, save=False)
+    for name in known:
+        if not (CACHE_DIR / name).is_file():
+            cache_manifest.remove(name, save=False)
+    cache_manifest.save_manifest()
+    if adopted:
+        logger.info("已登记清单中缺失的缓存: %d", adopted)
+    if removed:
+        logger.info("已清理过期缓存: %d", removed)
+    return removed
+
+
+def _precompute_pair(character_name: str, expr_name: str, bg_name: str) -> None:
+    # 在子进程中执行：save_base 先写临时文件再原子替换，避免中断后留下半张图
+    save_path = cache_file(character_name, expr_name, bg_name)
+    ensure_cache_dir()
+    save_base(compose_base(character_name, expr_name, bg_name), save_path)
+
+
+def generate_and_save_images(
+    character_name: str,
+    *,
+    on_progress: Callable[[int, int], None] | None = None,
+    cancel_event: threading.Event | None = None,
+) -> bool:
+    """
+    Composite every missing background × expression pair of the role into the cache.
+
+    Pairs are independent, so they are spread over a process pool. Pairs that
+    already exist on disk are skipped, which makes an interrupted run resumable.
+    Returns False if the run was cancelled through ``cancel_event``.
+    """
     expr_files = characters.get(character_name, {}).get("expression_files", [])
     bg_files = get_background_files()
 
     if not expr_files:
         print(f"未找到角色 {character_name} 的表情资源，跳过预合成。")
-        return
+        return True
 
     if not bg_files:
         print(f"未找到背景资源，跳过预合成。")
-        return
-
-    print("正在加载")
-    char_dir = CHARACTER_DIR / character_name
-
-    for bg_name in bg_files:
-        background_path = BACKGROUND_DIR / f"{bg_name}.png"
-        if not background_path.is_file():
-            continue
-        background = Image.open(background_path).convert("RGBA")
-
-        for expr_name in expr_files:
-            overlay_path = char_dir / f"{expr_name}.png"
-            if not overlay_path.is_file():
+        return True
+
+    return precompute_pairs(
+        character_name,
+        stale_pairs(character_name),
+        on_progress=on_progress,
+        cancel_event=cancel_event,
+    )
+
+
+def precompute_pairs(
+    character_name: str,
+    pairs: List[Tuple[str, str]],
+    *,
+    on_progress: Callable[[int, int], None] | None = None,
+    cancel_event: threading.Event | None = None,
+) -> bool:
+    """
+    Composite the given (expression, background) pairs into the cache on a
+    process pool and record them in the manifest. Returns False if cancelled.
+    """
+    total = len(pairs)
+    if on_progress:
+        on_progress(0, total)
+    if not pairs:
+        return True
+
+    workers = PRECOMPUTE_WORKERS or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=min(workers, total))
+    done = 0
+    last_save = time.monotonic()
+    jobs = {}
+    recorded: Set[Future] = set()
+    try:
+        # 提交前记录源文件指纹：合成期间若源文件被修改，下次检查会判定为过期
+        for expr_name, bg_name in pairs:
+            entry = _manifest_entry(character_name, expr_name, bg_name)
+            fut = executor.submit(_precompute_pair, character_name, expr_name, bg_name)
+            jobs[fut] = (cache_file(character_name, expr_name, bg_name).name, entry)
+        pending = set(jobs)
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(
+                    "预合成已取消: role=%s (%d/%d)", character_name, done, total
+                )
+                return False
+            finished, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                fut.result()
+                cache_manifest.record(*jobs[fut], save=False)
+                recorded.add(fut)
+                done += 1
+            # 分批落盘：中途被结束时已完成的组合仍在清单中，下次启动不会被清理
+            if finished and time.monotonic() - last_save >= MANIFEST_SAVE_INTERVAL:
+                cache_manifest.save_manifest()
+                last_save = time.monotonic()
+            if finished and on_progress:
+                on_progress(done, total)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        # 取消或出错退出时，已完成（含关闭进程池时跑完）但尚未收集的组合同样记入清单
+        for fut, job in jobs.items():
+            if fut in recorded or fut.cancelled() or fut.exception() is not None:
                 continue
-            overlay = Image.open(overlay_path).convert("RGBA")
-
-            result = background.copy()
-            result.paste(overlay, (0, 134), overlay)
-
-            save_path = cache_file(character_name, expr_name, bg_name)
-            result.save(save_path)
-
-    print("加载完成")
+            cache_manifest.record(*job, save=False)
+        cache_manifest.save_manifest()
+
+    logger.info("预合成完成: role=%s count=%d", character_name, total)
+    return True
+
+
+class PrecomputeJob:
+    """Run ``generate_and_save_images`` for one role on a background thread."""
+
+    def __init__(
+        self,
+        character_name: str,
+        on_done: Callable[["PrecomputeJob"], None] | None = None,
+    ) -> None:
+        self.character_name = character_name
+        self.done = 0
+        self.total = 0
+        self.completed = False
+        self.error: Exception | None = None
+        self._on_done = on_done
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"precompute-{character_name}", daemon=True
+        )
+
+    def start(self) -> "PrecomputeJob":
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def status_text(self) -> str:
+        if self.error is not None:
+            return f"预合成失败：{self.character_name}（{self.error}）"
+        if self.completed:
+            return f"已确认并预加载角色：{self.character_name}"
+        if self.cancelled:
+            return f"已取消预合成：{self.character_name}（{self.done}/{self.total}，再次按 C 可继续）"
+        return f"正在预合成：{self.character_name} {self.done}/{self.total}"
+
+    def _on_progress(self, done: int, total: int) -> None:
+        self.done, self.total = done, total
+
+    def _run(self) -> None:
+        try:
+            self.completed = generate_and_save_images(
+                self.character_name,
+                on_progress=self._on_progress,
+                cancel_event=self._cancel_event,
+            )
+        except Exception as e:
+            logger.exception("预合成失败: %s", e)
+            self.error = e
+        if self._on_done:
+            self._on_done(self)
+
+
+def _composite(background: Image.Image, overlay: Image.Image) -> Image.Image:
+    result = background.copy()
+    result.paste(overlay, OVERLAY_OFFSET, overlay)
+    return result
+
+
+def compose_base(character_name: str, expr_name: str, bg_name: str) -> Image.Image:
+    """Composite a single background × expression pair from the source resources."""
+    background_path = BACKGROUND_DIR / f"{bg_name}.png"
+    overlay_path = CHARACTER_DIR / character_name / f"{expr_name}.png"
+    if not background_path.is_file():
+        raise FileNotFoundError(f"背景资源不存在: {background_path}")
+    if not overlay_path.is_file():
+        raise FileNotFoundError(f"表情资源不存在: {overlay_path}")
+    background = Image.open(background_path).convert("RGBA")
+    overlay = Image.open(overlay_path).convert("RGBA")
+    return _composite(background, overlay)
+
+
+def get_base_image(character_name: str, expr_name: str, bg_name: str) -> Image.Image:
+    """
+    Return the composited base for the selection, building it on first use.
+
+    Recently used bases stay in an in-memory LRU; a base missing from the disk
+    cache is composited once and persisted, so only combinations that are
+    actually used cost CPU and disk. Callers must not modify the returned image.
+    """
+    key = (character_name, expr_name, bg_name)
+    entry = _manifest_entry(character_name, expr_name, bg_name)
+    with _lru_lock:
+        cached = _COMPOSITE_LRU.get(key)
+        if cached is not None and cached[0] == entry:
+            _COMPOSITE_LRU.move_to_end(key)
+            return cached[1]
+        building = _building.setdefault(key, threading.Lock())
+
+    with building:
+        try:
+            with _lru_lock:
+                cached = _COMPOSITE_LRU.get(key)
+                if cached is not None and cached[0] == entry:
+                    _COMPOSITE_LRU.move_to_end(key)
+                    return cached[1]
+
+            path = cache_file(character_name, expr_name, bg_name)
+            if entry is not None and cache_manifest.is_fresh(path.name, entry):
+                image = get_decoded_image(path)
+            else:
+                image = compose_base(character_name, expr_name, bg_name)
+                ensure_cache_dir()
+                save_base(image, path)
+                put_decoded_image(path, image)
+                cache_manifest.record(path.name, entry)
+
+            with _lru_lock:
+                _COMPOSITE_LRU[key] = (entry, image)
+                while len(_COMPOSITE_LRU) > COMPOSITE_CACHE_SIZE:
+                    _COMPOSITE_LRU.popitem(last=False)
+        finally:
+            # Failed builds must not leave a stale per-key lock behind
+            with _lru_lock:
+                if _building.get(key) is building:
+                    del _building[key]
+    return image
+
+
+def invalidate_bases(
+    character_name: str | None = None,
+    expr_name: str | None = None,
+    bg_name: str | None = None,
+) -> int:
+    """
+    Drop in-memory composites built from the given role / expression /
+    background (None matches any) together with their decoded cache entries.
+    Files in the disk cache are left alone: their manifest fingerprints no
+    longer match, so they are rebuilt on next use. Returns the number of
+    composites dropped.
+    """
+    wanted = (character_name, expr_name, bg_name)
+
+    def match(key: Tuple[str, str, str]) -> bool:
+        return all(w is None or w == k for w, k in zip(wanted, key))
+
+    with _lru_lock:
+        dropped = [k for k in _COMPOSITE_LRU if match(k)]
+        for k in dropped:
+            del _COMPOSITE_LRU[k]
+
+    # 解码缓存按文件路径索引：列出受影响组合的缓存文件名
+    keys = set(dropped)
+    for role in [character_name] if character_name else list(characters):
+        exprs = (
+            [expr_name]
+            if expr_name
+            else characters.get(role, {}).get("expression_files", [])
+        )
+        bgs = [bg_name] if bg_name else get_background_files()
+        keys.update((role, e, b) for e in exprs for b in bgs)
+    cache_dir = CACHE_DIR.resolve()
+    paths = {
+        str(cache_dir / compose_name(*key, suffix))
+        for key in keys
+        for suffix in CACHE_SUFFIXES.values()
+    }
+    decoded = decoded_images.discard(lambda k: k[0] in paths)
+    if dropped or decoded:
+        logger.info(
+            "已失效底图: role=%s expr=%s bg=%s (内存 %d，解码缓存 %d)",
+            character_name or "*",
+            expr_name or "*",
+            bg_name or "*",
+            len(dropped),
+            decoded,
+        )
+    return len(dropped)
 
 
 def get_selection(state: State) -> Tuple[str, str]:
@@ -158,7 +602,11 @@ def get_selection(state: State) -> Tuple[str, str]:
 
 
 def clear_cache() -> None:
-    for p in CACHE_DIR.glob("*.png"):
+    with _lru_lock:
+        _COMPOSITE_LRU.clear()
+    result_cache.clear()
+    cache_manifest.clear_manifest()
+    for p in [*iter_cache_files(), *CACHE_DIR.glob("*.tmp")]:
         try:
             p.unlink()
         except Exception:
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Tuple
+
+from PIL import Image
+
+from ..config.characters import characters
+from ..config.paths import BACKGROUND_DIR, font_path, get_background_files
+from ..config.settings import OUTPUT_FORMAT, TEXT_ED_POS, TEXT_ST_POS
+from ..config.text_configs import text_configs_dict
+from ..utils.decoration import decoration_ops
+from ..utils.image_encode import FORMAT_SUFFIXES
+from ..utils.text_draw import warm_text_resources
+from .generator import get_base_image
+from .paste_image import paste_image_to_bytes
+from .render_text import render_text_cached, render_text_to_bytes
+
+logger = logging.getLogger(__name__)
+
+# 无界面渲染任务：批处理与常驻服务共用，不依赖 TUI、热键或剪贴板
+
+# 输出文件名中不允许的字符：路径分隔符、Windows 保留字符与控制字符
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+# Windows 设备名：无论大小写、是否带扩展名都指向设备而不是文件
+_RESERVED_NAME = re.compile(
+    r"(CON|PRN|AUX|NUL|COM[1-9]|LPT[1-9])(\..*)?", re.IGNORECASE
+)
+
+
+def check_output_name(name: str) -> str:
+    """校验用户给出的输出文件名（不含扩展名），只能是输出目录下的单个文件名。"""
+    if (
+        name.strip(" .") == ""
+        or name != name.rstrip(" .")  # Windows 会去掉末尾的空格与点
+        or _UNSAFE_NAME.search(name)
+        or _RESERVED_NAME.fullmatch(name)
+    ):
+        raise ValueError(f"输出文件名无效: {name!r}")
+    return name
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    index: int
+    role: str
+    expression: str
+    background: str
+    text: str = ""
+    image: str | None = None  # 图片路径；给出时粘贴图片而不是绘制文本
+    name: str | None = None  # 输出文件名（不含扩展名）
+
+    @property
+    def base_key(self) -> Tuple[str, str, str]:
+        return (self.role, self.expression, self.background)
+
+    def output_name(self, output_format: str = OUTPUT_FORMAT) -> str:
+        stem = self.name or f"{self.index:06d}_{self.role}"
+        return stem + FORMAT_SUFFIXES.get(output_format.lower(), f".{output_format}")
+
+
+def parse_job(record: dict, index: int = 0) -> RenderJob:
+    """
+    校验一条记录并补全默认值：{"role", "expression"?, "background"?, "text" | "image", "name"?}。
+    未给出表情/背景时使用各自列表中的第一个。
+    """
+    if not isinstance(record, dict):
+        raise ValueError("记录必须是 JSON 对象")
+    role = record.get("role")
+    if role not in characters:
+        raise ValueError(f"未知角色: {role}")
+
+    exprs = characters[role]["expression_files"]
+    expression = str(record.get("expression") or (exprs[0] if exprs else ""))
+    if expression not in exprs:
+        raise ValueError(f"角色 {role} 没有表情: {expression}")
+
+    backgrounds = get_background_files()
+    background = str(
+        record.get("background") or (backgrounds[0] if backgrounds else "")
+    )
+    if background not in backgrounds:
+        raise ValueError(f"背景不存在: {background}")
+
+    text = str(record.get("text") or "")
+    image = record.get("image")
+    if not text and not image:
+        raise ValueError("记录缺少 text 或 image")
+    name = record.get("name")
+    return RenderJob(
+        index=index,
+        role=role,
+        expression=expression,
+        background=background,
+        text=text,
+        image=str(image) if image else None,
+        name=check_output_name(str(name)) if name else None,
+    )
+
+
+def render_job(
+    job: RenderJob, output_format: str = OUTPUT_FORMAT, use_cache: bool = False
+) -> bytes:
+    """
+    渲染一条任务并按 output_format 编码；底图与字体走进程内缓存。
+    use_cache 时文本任务经过结果缓存，重复的文本直接返回已编码的结果。
+    """
+    if use_cache and not job.image:
+        return render_text_cached(
+            *job.base_key,
+            rect_top_left=TEXT_ST_POS,
+            rect_bottom_right=TEXT_ED_POS,
+            text=job.text,
+            font_path=font_path(characters[job.role]["font"]),
+            output_format=output_format,
+        )
+    base = get_base_image(*job.base_key)
+    if job.image:
+        image_path = Path(job.image)
+        if not image_path.is_file():
+            raise FileNotFoundError(f"图片不存在: {image_path}")
+        with Image.open(image_path) as content:
+            content.load()
+            return paste_image_to_bytes(
+                base_image=base,
+                rect_top_left=TEXT_ST_POS,
+                rect_bottom_right=TEXT_ED_POS,
+                content_image=content,
+                role_name=job.role,
+                output_format=output_format,
+            )
+    return render_text_to_bytes(
+        base_image=base,
+        rect_top_left=TEXT_ST_POS,
+        rect_bottom_right=TEXT_ED_POS,
+        text=job.text,
+        font_path=font_path(characters[job.role]["font"]),
+        role_name=job.role,
+        output_format=output_format,
+    )
+
+
+def warm_roles(roles: Iterable[str], bg_name: str | None = None) -> None:
+    """
+    预先读入角色字体并生成姓名装饰字遮罩，供工作进程初始化与 TUI 导航预热调用。
+    装饰字按 bg_name（默认第一个背景）尺寸下文本绘制实际使用的比例生成，
+    图片粘贴使用原尺寸的装饰字，两者都预热。
+
+    预热只是优化：资源缺失或损坏时记录警告并跳过，不抛出异常（作为进程池初始化函数
+    抛出会使整个进程池失效），引用该资源的任务在渲染时各自失败。
+    """
+    if bg_name is None:
+        backgrounds = get_background_files()
+        bg_name = backgrounds[0] if backgrounds else None
+    base_size = None
+    if bg_name is not None:
+        try:
+            with Image.open(BACKGROUND_DIR / f"{bg_name}.png") as background:
+                base_size = background.size  # 只读文件头
+        except Exception as e:
+            logger.warning("预热时读取背景 %s 失败: %s", bg_name, e)
+    for role in roles:
+        if role not in characters:
+            continue
+        try:
+            if base_size is not None:
+                warm_text_resources(
+                    font_path(characters[role]["font"]),
+                    role,
+                    text_configs_dict,
+                    base_size,
+                )
+            decoration_ops(role, text_configs_dict)
+        except Exception as e:
+            logger.warning("预热角色 %s 失败: %s", role, e)
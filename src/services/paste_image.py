@@ -1,16 +1,18 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Tuple
+from typing import Tuple, Union
 
 from PIL import Image
 
+from ..config.settings import OUTPUT_FORMAT
 from ..config.text_configs import text_configs_dict
-from ..utils.image_paste import paste_image_auto
+from ..utils.image_encode import encode_image
+from ..utils.image_paste import paste_image_into
 
 
-def paste_image_to_bytes(
-    base_image: Path,
+def paste_image_to_image(
+    base_image: Union[Path, Image.Image],
     rect_top_left: Tuple[int, int],
     rect_bottom_right: Tuple[int, int],
     content_image: Image.Image,
@@ -18,8 +20,8 @@ def paste_image_to_bytes(
     allow_upscale: bool = True,
     keep_alpha: bool = True,
     role_name: str,
-) -> bytes:
-    return paste_image_auto(
+) -> Image.Image:
+    return paste_image_into(
         image_source=base_image,
         image_overlay=None,
         top_left=rect_top_left,
@@ -33,3 +35,26 @@ def paste_image_to_bytes(
         role_name=role_name,
         text_configs_dict=text_configs_dict,
     )
+
+
+def paste_image_to_bytes(
+    base_image: Union[Path, Image.Image],
+    rect_top_left: Tuple[int, int],
+    rect_bottom_right: Tuple[int, int],
+    content_image: Image.Image,
+    *,
+    allow_upscale: bool = True,
+    keep_alpha: bool = True,
+    role_name: str,
+    output_format: str = OUTPUT_FORMAT,
+) -> bytes:
+    image = paste_image_to_image(
+        base_image,
+        rect_top_left,
+        rect_bottom_right,
+        content_image,
+        allow_upscale=allow_upscale,
+        keep_alpha=keep_alpha,
+        role_name=role_name,
+    )
+    return encode_image(image, output_format)
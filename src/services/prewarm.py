@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import time
+from typing import Callable, List, Tuple
+
+from ..config.characters import characters
+from ..config.paths import get_background_files
+from ..utils.dirty_region import scaled_base
+from ..utils.text_draw import compressed_size
+from .generator import get_base_image
+from .jobs import warm_roles
+
+logger = logging.getLogger(__name__)
+
+# 连续按键时等待选择稳定后再开始预热（秒）
+DEBOUNCE = 0.05
+
+
+def _lower_thread_priority() -> None:
+    # 仅 Windows：将当前线程降为低于正常优先级，避免与生成热键争抢 CPU
+    if sys.platform != "win32":
+        return
+    try:
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadPriority(kernel32.GetCurrentThread(), -1)
+    except Exception:
+        pass
+
+
+def _neighbours(items: List[str], current: str) -> List[str]:
+    if current not in items or len(items) < 2:
+        return []
+    idx = items.index(current)
+    around = [items[(idx + 1) % len(items)], items[(idx - 1) % len(items)]]
+    return list(dict.fromkeys(x for x in around if x != current))
+
+
+class Prewarmer:
+    """
+    导航时在后台线程中预热当前选择：角色字体与姓名装饰字、当前组合的底图及其缩放结果，
+    再依次预热相邻表情/背景的底图。每次 schedule() 使代数加一，旧的预热在步骤之间检查
+    代数并放弃，因此快速切换时只有最后一次选择会被完整预热。
+    """
+
+    def __init__(self) -> None:
+        self._generation = 0
+        self._target: Tuple[str, str, str] | None = None
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def schedule(self, character_name: str, expr_name: str, bg_name: str) -> None:
+        with self._cond:
+            self._generation += 1
+            self._target = (character_name, expr_name, bg_name)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="prewarm", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self) -> None:
+        with self._cond:
+            self._generation += 1
+            self._target = None
+
+    def _steps(
+        self, character_name: str, expr_name: str, bg_name: str
+    ) -> List[Tuple[str, Callable[[], object]]]:
+        def base(expr: str, bg: str) -> Callable[[], object]:
+            def warm() -> None:
+                image = get_base_image(character_name, expr, bg)
+                scaled_base(image, compressed_size(image.size))
+
+            return warm
+
+        exprs = characters.get(character_name, {}).get("expression_files", [])
+        steps = [
+            ("fonts", lambda: warm_roles([character_name], bg_name)),
+            (f"{expr_name}/{bg_name}", base(expr_name, bg_name)),
+        ]
+        for expr in _neighbours(exprs, expr_name):
+            steps.append((f"{expr}/{bg_name}", base(expr, bg_name)))
+        for bg in _neighbours(get_background_files(), bg_name):
+            steps.append((f"{expr_name}/{bg}", base(expr_name, bg)))
+        # 最后再访问一次当前组合，使其在 LRU 中排在最前，不被相邻组合挤出
+        steps.append(
+            ("current", lambda: get_base_image(character_name, expr_name, bg_name))
+        )
+        return steps
+
+    def _run(self) -> None:
+        _lower_thread_priority()
+        while True:
+            with self._cond:
+                while self._target is None:
+                    self._cond.wait()
+                generation, target = self._generation, self._target
+                self._target = None
+            time.sleep(DEBOUNCE)
+            if generation != self._generation:
+                continue
+            t0 = time.perf_counter()
+            done = 0
+            for label, step in self._steps(*target):
+                if generation != self._generation:
+                    logger.debug("预热已取消: %s (%d 步后)", target, done)
+                    break
+                try:
+                    step()
+                except Exception as e:
+                    logger.warning("预热失败: %s %s: %s", target[0], label, e)
+                done += 1
+            else:
+                logger.debug(
+                    "预热完成: %s %d 步 %.1f ms",
+                    target,
+                    done,
+                    (time.perf_counter() - t0) * 1000,
+                )
+
+
+# 进程内共享的预热器
+prewarmer = Prewarmer()
@@ -1,21 +1,28 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Tuple
+from typing import Tuple, Union
 
+from PIL import Image
+
+from ..config.settings import OUTPUT_FORMAT
 from ..config.text_configs import text_configs_dict
-from ..utils.text_draw import draw_text_auto
+from ..utils.image_encode import encode_image
+from ..utils.text_draw import draw_text_image
+from ..utils.tracing import span
+from .generator import get_base_image
+from .result_cache import result_cache, result_key
 
 
-def render_text_to_bytes(
-    base_image: Path,
+def render_text_image(
+    base_image: Union[Path, Image.Image],
     rect_top_left: Tuple[int, int],
     rect_bottom_right: Tuple[int, int],
     text: str,
     font_path: Path,
     role_name: str,
-) -> bytes:
-    return draw_text_auto(
+) -> Image.Image:
+    return draw_text_image(
         image_source=base_image,
         image_overlay=None,
         top_left=rect_top_left,
@@ -29,3 +36,63 @@ def render_text_to_bytes(
         role_name=role_name,
         text_configs_dict=text_configs_dict,
     )
+
+
+def render_text_to_bytes(
+    base_image: Union[Path, Image.Image],
+    rect_top_left: Tuple[int, int],
+    rect_bottom_right: Tuple[int, int],
+    text: str,
+    font_path: Path,
+    role_name: str,
+    output_format: str = OUTPUT_FORMAT,
+) -> bytes:
+    image = render_text_image(
+        base_image, rect_top_left, rect_bottom_right, text, font_path, role_name
+    )
+    return encode_image(image, output_format)
+
+
+def render_text_cached(
+    character_name: str,
+    expr_name: str,
+    bg_name: str,
+    rect_top_left: Tuple[int, int],
+    rect_bottom_right: Tuple[int, int],
+    text: str,
+    font_path: Path,
+    output_format: str = OUTPUT_FORMAT,
+) -> bytes:
+    """
+    Render text onto the composited base of the selection and encode it,
+    memoized in the result cache: a repeated message with unchanged resources
+    skips loading the base, fitting, drawing and encoding.
+    """
+    tags = (character_name, expr_name, bg_name)
+    key = None
+    if result_cache.enabled:
+        with span("result_cache"):
+            key = result_key(
+                *tags,
+                text,
+                font_path,
+                (rect_top_left, rect_bottom_right),
+                output_format,
+            )
+            data = result_cache.get(key, tags, output_format)
+        if data is not None:
+            return data
+    with span("base"):
+        base_image = get_base_image(*tags)
+    data = render_text_to_bytes(
+        base_image,
+        rect_top_left,
+        rect_bottom_right,
+        text,
+        font_path,
+        character_name,
+        output_format,
+    )
+    if key is not None:
+        result_cache.put(key, tags, output_format, data)
+    return data
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from ..config.paths import BACKGROUND_DIR, CACHE_DIR, CHARACTER_DIR
+from ..config.settings import (
+    OUTPUT_QUALITY,
+    PNG_COMPRESS_LEVEL,
+    RESULT_CACHE_DISK_MB,
+    RESULT_CACHE_MB,
+    SCALED_RENDER,
+)
+from ..config.text_configs import text_configs_dict
+from ..utils.fonts import font_stamp, resolve_font, resolve_role_font
+from ..utils.image_encode import FORMAT_SUFFIXES
+from .cache_manifest import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# 渲染结果缓存：同一角色/表情/背景下重复发送的相同文本直接返回已编码的结果。
+# 键包含源文件指纹，资源变化后旧结果不会再命中；渲染逻辑变化时提升版本号
+RESULT_CACHE_VERSION = 2
+RESULT_DIR = CACHE_DIR / "results"
+
+# (角色, 表情, 背景)：用于按资源定向失效，也是磁盘上的子目录
+Tags = Tuple[str, str, str]
+
+
+def result_key(
+    character_name: str,
+    expr_name: str,
+    bg_name: str,
+    text: str,
+    font_path: Path,
+    rect: Tuple[Tuple[int, int], Tuple[int, int]],
+    output_format: str,
+) -> str:
+    """
+    由渲染输入、渲染设置与源文件指纹计算的内容地址。字体取实际加载的文件
+    （指定字体不存在时的默认字体、姓名装饰字使用的字体）及其读入时的指纹，
+    替换字体后旧结果不再命中，也不会把旧字体的渲染结果存到新指纹下。
+    """
+    body_font = Path(resolve_font(font_path))
+    role_font = resolve_role_font()
+    parts: List[Any] = [
+        RESULT_CACHE_VERSION,
+        character_name,
+        expr_name,
+        bg_name,
+        text,
+        str(body_font),
+        str(role_font),
+        [list(p) for p in rect],
+        output_format.lower(),
+        {
+            "scaled": SCALED_RENDER,
+            "png_level": PNG_COMPRESS_LEVEL,
+            "quality": OUTPUT_QUALITY,
+        },
+        file_fingerprint(BACKGROUND_DIR / f"{bg_name}.png"),
+        file_fingerprint(CHARACTER_DIR / character_name / f"{expr_name}.png"),
+        font_stamp(body_font),
+        font_stamp(role_font),
+        text_configs_dict.get(character_name),
+    ]
+    raw = json.dumps(parts, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """
+    两级结果缓存：内存中按字节预算 LRU，磁盘上按 角色/表情/背景/键.格式 存放、
+    超出预算时按最近访问时间淘汰。线程安全；磁盘写入先写临时文件再原子替换，
+    多个进程可共用同一目录。
+    """
+
+    def __init__(self, memory_bytes: int, disk_dir: Path, disk_bytes: int) -> None:
+        self.memory_bytes = max(0, int(memory_bytes))
+        self.disk_dir = disk_dir
+        self.disk_bytes = max(0, int(disk_bytes))
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, Tuple[bytes, Tags]]" = OrderedDict()
+        self._used = 0
+        self._disk_used: int | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory_bytes > 0 or self.disk_bytes > 0
+
+    def _path(self, key: str, tags: Tags, fmt: str) -> Path:
+        suffix = FORMAT_SUFFIXES.get(fmt.lower(), f".{fmt.lower()}")
+        return self.disk_dir.joinpath(*tags, f"{key}{suffix}")
+
+    def _remember(self, key: str, data: bytes, tags: Tags) -> None:
+        # 调用方持有锁
+        if len(data) > self.memory_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._used -= len(old[0])
+        self._items[key] = (data, tags)
+        self._used += len(data)
+        while self._used > self.memory_bytes and self._items:
+            _, (evicted, _) = self._items.popitem(last=False)
+            self._used -= len(evicted)
+
+    def get(self, key: str, tags: Tags, fmt: str) -> bytes | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.memory_hits += 1
+                return item[0]
+        data = None
+        if self.disk_bytes:
+            path = self._path(key, tags, fmt)
+            try:
+                data = path.read_bytes()
+                os.utime(path)  # 记录访问时间，供淘汰时参考
+            except OSError:
+                data = None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data, tags)
+        return data
+
+    def put(self, key: str, tags: Tags, fmt: str, data: bytes) -> None:
+        with self._lock:
+            self._remember(key, data, tags)
+        if not self.disk_bytes or len(data) > self.disk_bytes:
+            return
+        path = self._path(key, tags, fmt)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("写入结果缓存失败: %s", e)
+            return
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = self._disk_size()
+            else:
+                self._disk_used += len(data)
+            over = self._disk_used > self.disk_bytes
+        if over:
+            self._evict_disk()
+
+    def _disk_files(self) -> List[Path]:
+        files = self.disk_dir.glob("*/*/*/*")
+        return [p for p in files if not p.name.endswith(".tmp")]
+
+    def _disk_size(self) -> int:
+        total = 0
+        for p in self._disk_files():
+            try:
+                total += p.stat().st_size
+            except OSError:
+                continue
+        return total
+
+    def _evict_disk(self) -> None:
+        # 超出预算时删除最久未访问的文件，降到预算的 90%
+        files = []
+        for p in self._disk_files():
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, p))
+        files.sort()
+        used = sum(size for _, size, _ in files)
+        target = self.disk_bytes * 0.9
+        removed = 0
+        for _, size, p in files:
+            if used <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            used -= size
+            removed += 1
+        with self._lock:
+            self._disk_used = used
+        logger.info("结果缓存磁盘淘汰 %d 个文件，当前 %.1fMB", removed, used / 1048576)
+
+    def invalidate(
+        self,
+        character_name: str | None = None,
+        expr_name: str | None = None,
+        bg_name: str | None = None,
+    ) -> int:
+        """删除由指定角色/表情/背景（None 表示任意）渲染的结果，返回删除的条目数。"""
+        wanted = (character_name, expr_name, bg_name)
+
+        def match(tags: Tags) -> bool:
+            return all(w is None or w == t for w, t in zip(wanted, tags))
+
+        with self._lock:
+            keys = [k for k, (_, tags) in self._items.items() if match(tags)]
+            for k in keys:
+                self._used -= len(self._items.pop(k)[0])
+            self._disk_used = None
+        removed = len(keys)
+        pattern = [glob.escape(w) if w is not None else "*" for w in wanted]
+        for d in self.disk_dir.glob("/".join(pattern)):
+            removed += sum(1 for _ in d.iterdir()) if d.is_dir() else 0
+            shutil.rmtree(d, ignore_errors=True)
+        if removed:
+            logger.info(
+                "已失效渲染结果: role=%s expr=%s bg=%s (%d 条)",
+                character_name or "*",
+                expr_name or "*",
+                bg_name or "*",
+                removed,
+            )
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._used = 0
+            self._disk_used = None
+        shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._items),
+                "memory_used_bytes": self._used,
+                "disk_used_bytes": self._disk_used,
+            }
+
+    def status_line(self) -> str | None:
+        """TUI 状态行：命中率与各级命中次数。"""
+        s = self.stats()
+        if not (s["memory_hits"] or s["disk_hits"] or s["misses"]):
+            return None
+        return (
+            f"结果缓存 命中率 {s['hit_rate']:.0%}（内存 {s['memory_hits']} / "
+            f"磁盘 {s['disk_hits']} / 未命中 {s['misses']}）"
+        )
+
+
+# 进程内共享的结果缓存
+result_cache = ResultCache(
+    RESULT_CACHE_MB * 1024 * 1024, RESULT_DIR, RESULT_CACHE_DISK_MB * 1024 * 1024
+)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Tuple
+
+from ..config import characters as character_registry
+from ..config import text_configs
+from ..config.paths import (
+    BACKGROUND_DIR,
+    CHARACTER_DIR,
+    CONFIG_DIR,
+    FONT_DIR,
+    reload_background_files,
+)
+from ..config.settings import WATCH_INTERVAL
+from ..utils.decoration import clear_decoration_cache
+from ..utils.fonts import clear_font_cache
+from .generator import invalidate_bases
+from .result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+# 被监视的文件：("config", 文件名) / ("background", 名称) /
+# ("expression", 角色, 名称) / ("font", 文件名)
+Key = Tuple[str, ...]
+Stamp = Tuple[int, int]
+
+# 修改后需重启才能生效的配置文件
+RESTART_CONFIGS = {"settings.yaml"}
+
+
+@dataclass(frozen=True)
+class Changes:
+    """一次稳定下来的文件变化，按新增/删除/修改分组。"""
+
+    added: FrozenSet[Key]
+    removed: FrozenSet[Key]
+    modified: FrozenSet[Key]
+
+    def of(self, kind: str, *, listing: bool = False) -> FrozenSet[Key]:
+        """某类文件的变化；listing=True 时只包含新增与删除（即影响列表的变化）。"""
+        keys = self.added | self.removed
+        if not listing:
+            keys = keys | self.modified
+        return frozenset(k for k in keys if k[0] == kind)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def describe(self) -> str:
+        parts = []
+        groups = (("新增", self.added), ("删除", self.removed), ("修改", self.modified))
+        for label, keys in groups:
+            if keys:
+                names = sorted("/".join(k[1:]) for k in keys)
+                more = f" 等 {len(names)} 个" if len(names) > 5 else ""
+                parts.append(f"{label} {', '.join(names[:5])}{more}")
+        return "；".join(parts)
+
+
+def _scan_dir(path: Path, suffix: str | None = None) -> Dict[str, Stamp]:
+    # scandir 在 Windows 上随目录项返回 stat 信息，无需逐个文件系统调用
+    files: Dict[str, Stamp] = {}
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if suffix and not entry.name.lower().endswith(suffix):
+                    continue
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        files[entry.name] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files
+
+
+def scan() -> Dict[Key, Stamp]:
+    """列出 config/ 与 resource/ 下被监视的文件及其 (mtime, 大小)。"""
+    stamps: Dict[Key, Stamp] = {}
+    for name, st in _scan_dir(CONFIG_DIR, ".yaml").items():
+        stamps[("config", name)] = st
+    for name, st in _scan_dir(BACKGROUND_DIR, ".png").items():
+        stamps[("background", name[:-4])] = st
+    for name, st in _scan_dir(FONT_DIR).items():
+        stamps[("font", name)] = st
+    try:
+        roles = [e.name for e in os.scandir(CHARACTER_DIR) if e.is_dir()]
+    except OSError:
+        roles = []
+    for role in roles:
+        for name, st in _scan_dir(CHARACTER_DIR / role, ".png").items():
+            stamps[("expression", role, name[:-4])] = st
+    return stamps
+
+
+def diff(old: Dict[Key, Stamp], new: Dict[Key, Stamp]) -> Changes:
+    return Changes(
+        added=frozenset(new.keys() - old.keys()),
+        removed=frozenset(old.keys() - new.keys()),
+        modified=frozenset(k for k in new.keys() & old.keys() if new[k] != old[k]),
+    )
+
+
+def reload_registries(changes: Changes) -> None:
+    """就地刷新角色表、姓名装饰配置与背景列表，只失效受影响的缓存。"""
+    configs = {k[1] for k in changes.of("config")}
+    roles_listed = {k[1] for k in changes.of("expression", listing=True)}
+
+    if "character.yaml" in configs or roles_listed:
+        old_roles = set(character_registry.characters)
+        old_configs = dict(text_configs.text_configs_dict)
+        character_registry.reload()
+        text_configs.reload()
+        new_configs = text_configs.text_configs_dict
+        for role in old_roles - set(character_registry.characters):
+            invalidate_bases(character_name=role)
+            result_cache.invalidate(character_name=role)
+        for role in set(old_configs) | set(new_configs):
+            if old_configs.get(role) != new_configs.get(role):
+                clear_decoration_cache(role)
+                result_cache.invalidate(character_name=role)
+        logger.info(
+            "角色表已重新加载: %d 个角色", len(character_registry.character_list)
+        )
+
+    if changes.of("background", listing=True):
+        logger.info("背景列表已重新加载: %d 个背景", len(reload_background_files()))
+    for key in changes.of("background"):
+        invalidate_bases(bg_name=key[1])
+        result_cache.invalidate(bg_name=key[1])
+    for key in changes.of("expression"):
+        invalidate_bases(character_name=key[1], expr_name=key[2])
+        result_cache.invalidate(character_name=key[1], expr_name=key[2])
+
+    if changes.of("font"):
+        # 字体按文件名缓存解析结果，姓名装饰字的遮罩由字体绘制
+        clear_font_cache()
+        clear_decoration_cache()
+        result_cache.clear()
+        logger.info("字体已更新，已清空字体、姓名装饰与渲染结果缓存")
+
+    restart = configs & RESTART_CONFIGS
+    if restart:
+        logger.warning("配置文件 %s 已修改，重启后生效", "、".join(sorted(restart)))
+
+
+class ResourceWatcher:
+    """
+    轮询 config/ 与 resource/ 的文件 (mtime, 大小)，变化在连续两次轮询间不再改变后
+    （文件已复制完毕）才按注册顺序通知监听器。默认监听器 reload_registries 最先执行，
+    后注册的监听器看到的是已刷新的注册表。
+    """
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self._listeners: List[Callable[[Changes], None]] = [reload_registries]
+        self._stamps: Dict[Key, Stamp] | None = None
+        self._pending: Dict[Key, Stamp] | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[Changes], None]) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Changes], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def poll(self) -> Changes | None:
+        """扫描一次；有已稳定的变化时通知监听器并返回该变化。"""
+        current = scan()
+        if self._stamps is None:
+            self._stamps = current
+            return None
+        if current == self._stamps:
+            self._pending = None
+            return None
+        if current != self._pending:
+            # 仍在变化（例如正在复制大文件），下一轮再确认
+            self._pending = current
+            return None
+        changes = diff(self._stamps, current)
+        self._stamps, self._pending = current, None
+        logger.info("检测到资源变化：%s", changes.describe())
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(changes)
+            except Exception as e:
+                logger.exception("处理资源变化失败: %s", e)
+        return changes
+
+    def start(self) -> "ResourceWatcher":
+        if self._thread is None:
+            self._stamps = scan()
+            self._thread = threading.Thread(
+                target=self._run, name="resource-watcher", daemon=True
+            )
+            self._thread.start()
+            logger.info("已开始监视配置与资源目录（间隔 %.1fs）", self.interval)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception("扫描资源目录失败: %s", e)
+
+
+# 进程内共享的监视器
+watcher = ResourceWatcher(WATCH_INTERVAL)
@@ -78,10 +78,26 @@ def run_tui(
     *,
     on_confirm: Callable[[State], str | None],
     on_generate: Callable[[State], str | None],
+    on_select: Callable[[State], None] | None = None,
+    get_status: Callable[[State], str | None] | None = None,
 ) -> None:
+    """
+    on_select: called after the role/expression/background selection changes.
+    get_status: polled while idle; a changed result refreshes the status line
+    (e.g. background precompute progress).
+    """
     status: str | None = None
     _render(state, status)
     while True:
+        if not msvcrt.kbhit():
+            if get_status:
+                polled = get_status(state)
+                if polled and polled != status:
+                    status = polled
+                    _render(state, status)
+            time.sleep(0.05)
+            continue
+
         ch = msvcrt.getwch()
         if ch in ("q", "Q"):
             break
@@ -96,35 +112,24 @@ def run_tui(
             if code == "H":  # Up
                 new_idx = (state.selected_role_index - 1) % len(character_list)
                 set_role(state, new_idx)
-                status = None
-                _render(state, status)
-                continue
-            if code == "P":  # Down
+            elif code == "P":  # Down
                 new_idx = (state.selected_role_index + 1) % len(character_list)
                 set_role(state, new_idx)
-                status = None
-                _render(state, status)
-                continue
-            if code == "K":  # Left
+            elif code == "K":  # Left
                 adjust_expr(state, -1)
-                status = None
-                _render(state, status)
-                continue
-            if code == "M":  # Right
+            elif code == "M":  # Right
                 adjust_expr(state, +1)
-                status = None
-                _render(state, status)
-                continue
-            if code == "I":  # PgUp
+            elif code == "I":  # PgUp
                 adjust_bg(state, -1)
-                status = None
-                _render(state, status)
-                continue
-            if code == "Q":  # PgDn
+            elif code == "Q":  # PgDn
                 adjust_bg(state, +1)
-                status = None
-                _render(state, status)
+            else:
                 continue
+            if on_select:
+                on_select(state)
+            status = get_status(state) if get_status else None
+            _render(state, status)
+            continue
 
         # Ignore other keys
         time.sleep(0.01)
@@ -0,0 +1,72 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+# 等待剪贴板变化的轮询逻辑；读取函数、时钟与 sleep 均可注入，便于用模拟剪贴板测试
+
+Clock = Callable[[], float]
+Sleep = Callable[[float], None]
+
+
+@dataclass(frozen=True)
+class WaitResult:
+    changed: bool  # 是否在超时前观察到预期的变化
+    waited: float  # 实际等待的秒数
+    value: Hashable  # 最后一次读到的值
+
+
+def wait_for_change(
+    read: Callable[[], Hashable],
+    initial: Hashable,
+    *,
+    interval: float = 0.01,
+    timeout: float = 0.5,
+    settle: float = 0.0,
+    clock: Clock = time.perf_counter,
+    sleep: Sleep = time.sleep,
+) -> WaitResult:
+    """
+    每隔 interval 秒读取一次 read()，直到其值不同于 initial 并在 settle 秒内不再变化，
+    或超过 timeout。典型用法为等待剪贴板序列号在剪切后递增。
+    """
+    start = clock()
+    deadline = start + timeout
+    last = initial
+    changed_at: float | None = None
+    while True:
+        value = read()
+        now = clock()
+        if value != last:
+            last, changed_at = value, now
+        if changed_at is not None and now - changed_at >= settle:
+            return WaitResult(True, now - start, last)
+        if now >= deadline:
+            return WaitResult(changed_at is not None, now - start, last)
+        sleep(min(interval, deadline - now))
+
+
+def wait_for_release(
+    read_busy: Callable[[], bool],
+    *,
+    interval: float = 0.005,
+    timeout: float = 0.3,
+    clock: Clock = time.perf_counter,
+    sleep: Sleep = time.sleep,
+) -> WaitResult:
+    """
+    等待 read_busy() 先变为真、再变回假（例如目标程序打开剪贴板读取后关闭），
+    或超过 timeout。未观察到完整过程时 changed 为 False，调用方应视作已等满超时。
+    """
+    start = clock()
+    deadline = start + timeout
+    seen_busy = False
+    while True:
+        busy = bool(read_busy())
+        now = clock()
+        if busy:
+            seen_busy = True
+        elif seen_busy:
+            return WaitResult(True, now - start, False)
+        if now >= deadline:
+            return WaitResult(False, now - start, busy)
+        sleep(min(interval, deadline - now))
@@ -0,0 +1,78 @@
+import threading
+from typing import Dict, List, Tuple
+
+from .dirty_region import DrawOp, text_mask
+from .fonts import load_role_font
+
+# 角色姓名装饰字：只依赖角色配置，渲染一次后缓存为字形遮罩
+SHADOW_OFFSET = (2, 2)  # 阴影偏移量
+SHADOW_COLOR = (0, 0, 0)  # 黑色阴影
+
+_CACHE: Dict[Tuple, List[DrawOp]] = {}
+_lock = threading.Lock()
+
+
+def _config_key(role_name: str, configs: List[dict], scale: float) -> Tuple:
+    return (
+        role_name,
+        scale,
+        tuple(
+            (
+                c["text"],
+                tuple(c["position"]),
+                tuple(c["font_color"]),
+                c["font_size"],
+            )
+            for c in configs
+        ),
+    )
+
+
+def _render(configs: List[dict], scale: float) -> List[DrawOp]:
+    ops: List[DrawOp] = []
+    dx, dy = (max(1, round(d * scale)) for d in SHADOW_OFFSET)
+    for config in configs:
+        role_text = config["text"]
+        if not role_text:
+            continue
+        x, y = (round(v * scale) for v in config["position"])
+        # 使用 resource/font 下的字体（默认字体，不存在时依次尝试后备字体）
+        role_font = load_role_font(max(1, round(config["font_size"] * scale)))
+        rendered = text_mask(role_text, role_font)
+        if rendered is None:
+            continue
+        mask, (left, top) = rendered
+        # 先绘制阴影文字，再绘制主文字（覆盖在阴影上方）
+        shadow = (x + dx + left, y + dy + top)
+        ops.append((shadow, mask, None, SHADOW_COLOR))
+        ops.append(((x + left, y + top), mask, None, tuple(config["font_color"])))
+    return ops
+
+
+def decoration_ops(
+    role_name: str, text_configs_dict: dict | None, scale: float = 1.0
+) -> List[DrawOp]:
+    """
+    返回角色姓名装饰字的绘制操作（按配置内容缓存，配置变化时自动重新渲染）。
+    scale 不为 1 时坐标与字号按比例换算，用于直接在输出分辨率下绘制。
+    """
+    if not text_configs_dict or role_name not in text_configs_dict:
+        return []
+    configs = text_configs_dict[role_name]
+    key = _config_key(role_name, configs, scale)
+    with _lock:
+        ops = _CACHE.get(key)
+    if ops is None:
+        ops = _render(configs, scale)
+        with _lock:
+            # 同一角色、同一比例只保留最新配置对应的结果
+            for k in [k for k in _CACHE if k[:2] == key[:2]]:
+                del _CACHE[k]
+            _CACHE[key] = ops
+    return ops
+
+
+def clear_decoration_cache(role_name: str | None = None) -> None:
+    with _lock:
+        for k in [k for k in _CACHE if role_name is None or k[0] == role_name]:
+            del _CACHE[k]
@@ -0,0 +1,171 @@
+import math
+from typing import List, Sequence, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .image_cache import get_derived_image
+from .tracing import span
+
+Box = Tuple[int, int, int, int]
+Color = Tuple[int, ...]
+FontLike = Union[ImageFont.FreeTypeFont, ImageFont.ImageFont]
+# 一次绘制：(坐标, 文本, 字体, 颜色)；内容为 "L" 图像时表示以该遮罩在坐标处填充颜色，
+# 此时颜色也可以是与遮罩同尺寸的颜色图层（如一行内按片段着色）
+DrawOp = Tuple[
+    Tuple[int, int], Union[str, Image.Image], FontLike | None, Union[Color, Image.Image]
+]
+
+# LANCZOS 的支撑半径（源像素，按缩放比例放大）
+_LANCZOS_SUPPORT = 3.0
+
+
+def _union(a: Box | None, b: Box | None) -> Box | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def ops_bbox(ops: Sequence[DrawOp], pad: int = 1) -> Box | None:
+    """返回一组绘制操作会修改的像素范围（与 ImageDraw.text 使用同一套字形尺寸）。"""
+    box: Box | None = None
+    for (x, y), content, font, _ in ops:
+        if isinstance(content, Image.Image):
+            left, top, right, bottom = 0, 0, content.width, content.height
+        elif content:
+            left, top, right, bottom = font.getbbox(content, mode="L")
+        else:
+            continue
+        box = _union(
+            box, (x + left - pad, y + top - pad, x + right + pad, y + bottom + pad)
+        )
+    return box
+
+
+def text_mask(text: str, font: FontLike) -> Tuple[Image.Image, Tuple[int, int]] | None:
+    """
+    将文本栅格化为紧贴字形的 "L" 遮罩，返回 (遮罩, 相对绘制坐标的偏移)；无可见像素时返回 None。
+    同一遮罩可在不同坐标以不同颜色填充多次（阴影与正文），结果与逐次 ImageDraw.text 一致。
+    """
+    left, top, right, bottom = font.getbbox(text, mode="L")
+    if right <= left or bottom <= top:
+        return None
+    mask = Image.new("L", (right - left, bottom - top))
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+    return mask, (left, top)
+
+
+def draw_ops(
+    img: Image.Image, ops: Sequence[DrawOp], origin: Tuple[int, int] = (0, 0)
+) -> None:
+    """在 img 上按顺序执行绘制操作；origin 为 img 左上角在整张画布中的坐标。"""
+    draw = ImageDraw.Draw(img)
+    ox, oy = origin
+    for (x, y), content, font, fill in ops:
+        if isinstance(content, Image.Image):
+            img.paste(fill, (x - ox, y - oy), content)
+        elif content:
+            draw.text((x - ox, y - oy), content, font=font, fill=fill)
+
+
+def scaled_base(base: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """返回按源图像缓存的 LANCZOS 缩放结果；调用方不得修改。"""
+    return get_derived_image(
+        base,
+        ("scaled", size),
+        lambda src: src.resize(size, Image.Resampling.LANCZOS),
+    )
+
+
+def render_scaled(
+    base: Image.Image,
+    groups: Sequence[Sequence[DrawOp]],
+    out_size: Tuple[int, int],
+) -> Image.Image:
+    """
+    等价于“在底图副本上执行所有绘制后整体 LANCZOS 缩放到 out_size”，但只在受影响的区域工作：
+
+    缩放后的底图按源图像缓存；每组绘制操作只在其包围盒（外扩重采样支撑半径）的裁剪区域上绘制，
+    再用 resize(box=...) 只重采样对应的输出像素并贴回。与整图缩放相比，个别像素可能因浮点
+    系数差异相差 1 个色阶。
+    """
+    width, height = base.size
+    out_w, out_h = out_size
+    sx, sy = out_w / width, out_h / height
+    mx = _LANCZOS_SUPPORT * max(1.0, 1 / sx) + 2
+    my = _LANCZOS_SUPPORT * max(1.0, 1 / sy) + 2
+
+    # 每组对应的输出区域；区域相交的组合并，保证后绘制的内容不会被先前贴回的区域覆盖
+    regions: List[Tuple[Box, List[int]]] = []
+    for idx, ops in enumerate(groups):
+        box = ops_bbox(ops)
+        if box is None:
+            continue
+        dest = (
+            max(0, math.floor(box[0] * sx) - 4),
+            max(0, math.floor(box[1] * sy) - 4),
+            min(out_w, math.ceil(box[2] * sx) + 4),
+            min(out_h, math.ceil(box[3] * sy) + 4),
+        )
+        if dest[0] >= dest[2] or dest[1] >= dest[3]:
+            continue
+        members = [idx]
+        hits = [r for r in regions if _intersects(r[0], dest)]
+        while hits:
+            for other in hits:
+                regions.remove(other)
+                dest = _union(other[0], dest)
+                members += other[1]
+            hits = [r for r in regions if _intersects(r[0], dest)]
+        regions.append((dest, sorted(members)))
+
+    with span("downscale"):
+        out = scaled_base(base, out_size).copy()
+    for dest, members in regions:
+        ops = [op for idx in members for op in groups[idx]]
+        # 源坐标按整图缩放的映射换算，并外扩支撑半径，使边缘像素的重采样输入完整
+        src = (
+            dest[0] * width / out_w,
+            dest[1] * height / out_h,
+            dest[2] * width / out_w,
+            dest[3] * height / out_h,
+        )
+        crop = (
+            max(0, math.floor(src[0] - mx)),
+            max(0, math.floor(src[1] - my)),
+            min(width, math.ceil(src[2] + mx)),
+            min(height, math.ceil(src[3] + my)),
+        )
+        with span("draw"):
+            work = base.crop(crop)
+            draw_ops(work, ops, origin=crop[:2])
+        with span("downscale"):
+            patch = work.resize(
+                (dest[2] - dest[0], dest[3] - dest[1]),
+                Image.Resampling.LANCZOS,
+                box=(
+                    src[0] - crop[0],
+                    src[1] - crop[1],
+                    src[2] - crop[0],
+                    src[3] - crop[1],
+                ),
+            )
+            out.paste(patch, dest[:2])
+    return out
+
+
+def paste_overlay(img: Image.Image, overlay: Image.Image) -> None:
+    """将全画布尺寸的置顶图层贴到 img 上，只处理图层中不透明的部分。"""
+    if "A" not in overlay.getbands():
+        img.paste(overlay, (0, 0), overlay)
+        return
+    bbox = overlay.getchannel("A").getbbox()
+    if bbox is None:
+        return
+    region = overlay.crop(bbox)
+    img.paste(region, bbox[:2], region)
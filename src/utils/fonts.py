@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from PIL import ImageFont
+
+from ..config.paths import FONT_DIR
+from ..config.settings import DEFAULT_FONT, FONT_CACHE_SIZE
+
+FontLike = Union[ImageFont.FreeTypeFont, ImageFont.ImageFont]
+
+# 字体文件只读取一次，按 (字体, 字号) 缓存 FreeTypeFont（LRU）
+_FONT_DATA: Dict[str, bytes] = {}
+# 读入字体文件时的 [mtime_ns, 大小]，描述进程内实际使用的字体版本
+_FONT_STAMPS: Dict[str, List[int]] = {}
+_FONTS: "OrderedDict[Tuple[str, int], ImageFont.FreeTypeFont]" = OrderedDict()
+_EXISTS: Dict[str, bool] = {}
+_lock = threading.RLock()
+
+# 角色姓名装饰字的后备字体
+ROLE_FALLBACK_FONTS = ["font3.ttf", "Song.ttf", "Yahei.ttf"]
+# 资源字体都不存在时交给 Pillow 按名称查找的系统字体
+SYSTEM_FONT = "DejaVuSans.ttf"
+
+
+def _exists(path: Union[str, Path]) -> bool:
+    key = str(path)
+    with _lock:
+        if key not in _EXISTS:
+            _EXISTS[key] = Path(path).exists()
+        return _EXISTS[key]
+
+
+def _font_data(font_file: Union[str, Path]) -> bytes:
+    with _lock:
+        data = _FONT_DATA.get(str(font_file))
+        if data is None:
+            st = Path(font_file).stat()
+            data = _FONT_DATA[str(font_file)] = Path(font_file).read_bytes()
+            _FONT_STAMPS[str(font_file)] = [st.st_mtime_ns, st.st_size]
+        return data
+
+
+def font_stamp(font_file: Union[str, Path, None]) -> List[int] | None:
+    """
+    字体文件的 [mtime_ns, 大小]：已读入时为读入时的值（与实际绘制使用的字体一致），
+    否则为当前文件的值；不是文件（如系统字体名）时为 None。
+    """
+    if font_file is None:
+        return None
+    with _lock:
+        stamp = _FONT_STAMPS.get(str(font_file))
+    if stamp is not None:
+        return stamp
+    try:
+        st = Path(font_file).stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def get_font(font_file: Union[str, Path], size: int) -> ImageFont.FreeTypeFont:
+    """返回指定字号的字体；同一文件只解析一次，系统字体名交给 Pillow 查找。"""
+    key = (str(font_file), int(size))
+    with _lock:
+        font = _FONTS.get(key)
+        if font is not None:
+            _FONTS.move_to_end(key)
+            return font
+        if Path(font_file).is_file():
+            font = ImageFont.truetype(BytesIO(_font_data(font_file)), size=key[1])
+        else:
+            font = ImageFont.truetype(key[0], size=key[1])
+        _FONTS[key] = font
+        while len(_FONTS) > FONT_CACHE_SIZE:
+            _FONTS.popitem(last=False)
+        return font
+
+
+def resolve_font(font_path: Union[str, Path, None]) -> Union[str, Path]:
+    """load_font 实际使用的字体：指定字体 -> 默认字体 -> SYSTEM_FONT（系统字体名）。"""
+    if font_path and _exists(font_path):
+        return font_path
+    # 如果指定的字体不存在，尝试使用配置的默认字体
+    default_font_path = FONT_DIR / DEFAULT_FONT
+    if _exists(default_font_path):
+        return default_font_path
+    return SYSTEM_FONT
+
+
+def resolve_role_font() -> Path | None:
+    """load_role_font 实际使用的字体文件：默认字体 -> ROLE_FALLBACK_FONTS，都不存在时为 None。"""
+    for name in [DEFAULT_FONT, *ROLE_FALLBACK_FONTS]:
+        path = FONT_DIR / name
+        if _exists(path):
+            return path
+    return None
+
+
+def load_font(font_path: Union[str, Path, None], size: int) -> FontLike:
+    """按 指定字体 -> 默认字体 -> DejaVuSans -> Pillow 内置字体 的顺序加载。"""
+    resolved = resolve_font(font_path)
+    if resolved != SYSTEM_FONT:
+        return get_font(resolved, size)
+    try:
+        return get_font(SYSTEM_FONT, size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def load_role_font(size: int) -> FontLike:
+    """角色姓名装饰字字体：默认字体 -> ROLE_FALLBACK_FONTS -> Pillow 内置字体。"""
+    path = resolve_role_font()
+    if path is None:
+        return ImageFont.load_default()
+    return get_font(path, size)
+
+
+def warm_font(font_path: Union[str, Path, None]) -> None:
+    """预先读入 load_font 将使用的字体文件；字号由排版搜索决定，之后各字号只需解析、无需读盘。"""
+    resolved = resolve_font(font_path)
+    if Path(resolved).is_file():
+        _font_data(resolved)
+
+
+def clear_font_cache() -> None:
+    with _lock:
+        _FONTS.clear()
+        _FONT_DATA.clear()
+        _FONT_STAMPS.clear()
+        _EXISTS.clear()
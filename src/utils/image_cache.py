@@ -0,0 +1,153 @@
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Tuple, Union
+
+from PIL import Image
+
+from ..config.settings import IMAGE_CACHE_MB
+from .raw_image import load_base
+
+logger = logging.getLogger(__name__)
+
+
+def image_nbytes(image: Image.Image) -> int:
+    """估算解码后图像占用的内存字节数。"""
+    return image.width * image.height * len(image.getbands())
+
+
+class ImageCache:
+    """按字节预算淘汰（LRU）的解码图像缓存，线程安全。缓存中的图像不可被修改。"""
+
+    def __init__(self, budget_bytes: int, name: str = "image") -> None:
+        self.budget_bytes = max(0, int(budget_bytes))
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.used_bytes = 0
+        self._items: "OrderedDict[Hashable, Tuple[Image.Image, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Image.Image | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key: Hashable, image: Image.Image) -> None:
+        size = image_nbytes(image)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.used_bytes -= old[1]
+            if size > self.budget_bytes:
+                return
+            self._items[key] = (image, size)
+            self.used_bytes += size
+            while self.used_bytes > self.budget_bytes and self._items:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.used_bytes -= evicted
+                self.evictions += 1
+
+    def get_or_load(
+        self, key: Hashable, loader: Callable[[], Image.Image]
+    ) -> Image.Image:
+        image = self.get(key)
+        with self._lock:
+            if image is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            hit = image is not None
+            hits, misses = self.hits, self.misses
+        logger.log(
+            logging.DEBUG if hit else logging.INFO,
+            "%s缓存%s: %s (hits=%d misses=%d used=%.1f/%.0fMB)",
+            self.name,
+            "命中" if hit else "未命中",
+            key,
+            hits,
+            misses,
+            self.used_bytes / 1048576,
+            self.budget_bytes / 1048576,
+        )
+        if image is None:
+            image = loader()
+            self.put(key, image)
+        return image
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """移除所有满足条件的键，返回移除数量。"""
+        with self._lock:
+            keys = [k for k in self._items if predicate(k)]
+            for k in keys:
+                self.used_bytes -= self._items.pop(k)[1]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.used_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._items),
+                "used_bytes": self.used_bytes,
+                "budget_bytes": self.budget_bytes,
+            }
+
+
+# 进程内共享的底图解码缓存，文本与图片渲染共用
+decoded_images = ImageCache(IMAGE_CACHE_MB * 1024 * 1024, name="底图解码")
+
+
+def _path_key(path: Union[str, Path]) -> Tuple[str, int, int]:
+    st = Path(path).stat()
+    return str(Path(path).resolve()), st.st_mtime_ns, st.st_size
+
+
+def get_decoded_image(path: Union[str, Path]) -> Image.Image:
+    """按 (路径, mtime, 大小) 返回解码后的 RGBA 底图；调用方需 copy() 后再修改。"""
+    key = _path_key(path)
+    # 文件更新后旧版本不会再命中，顺手释放
+    decoded_images.discard(lambda k: k[0] == key[0] and k != key)
+    return decoded_images.get_or_load(key, lambda: load_base(path))
+
+
+def put_decoded_image(path: Union[str, Path], image: Image.Image) -> None:
+    """将刚生成并保存的底图放入缓存，避免下次再从磁盘解码。"""
+    decoded_images.put(_path_key(path), image)
+
+
+# 由某张源图像派生的图像（如缩放后的底图），随源图像对象一起释放
+_DERIVED: Dict[int, Tuple["weakref.ref[Image.Image]", Dict[Hashable, Image.Image]]] = {}
+_derived_lock = threading.Lock()
+
+
+def get_derived_image(
+    source: Image.Image,
+    tag: Hashable,
+    factory: Callable[[Image.Image], Image.Image],
+) -> Image.Image:
+    """按 (源图像对象, tag) 缓存 factory(source) 的结果；调用方不得修改返回的图像。"""
+    key = id(source)
+    with _derived_lock:
+        entry = _DERIVED.get(key)
+        if entry is None or entry[0]() is not source:
+            ref = weakref.ref(source, lambda _r, k=key: _DERIVED.pop(k, None))
+            entry = _DERIVED[key] = (ref, {})
+        image = entry[1].get(tag)
+    if image is None:
+        image = factory(source)
+        with _derived_lock:
+            entry[1][tag] = image
+    return image
@@ -0,0 +1,63 @@
+from io import BytesIO
+from typing import Callable, Dict
+
+from PIL import Image
+
+from ..config.settings import OUTPUT_QUALITY, PNG_COMPRESS_LEVEL
+from .tracing import span
+
+# 输出编码器：渲染结果只在最终目的地需要的格式下编码一次
+Encoder = Callable[[Image.Image], bytes]
+
+# 输出格式对应的文件扩展名
+FORMAT_SUFFIXES = {"png": ".png", "webp": ".webp", "jpeg": ".jpg", "dib": ".dib"}
+
+
+def _save(image: Image.Image, fmt: str, **params) -> bytes:
+    buf = BytesIO()
+    image.save(buf, format=fmt, **params)
+    return buf.getvalue()
+
+
+def _opaque(image: Image.Image) -> Image.Image:
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def encode_dib(image: Image.Image) -> bytes:
+    """剪贴板 CF_DIB 数据（BITMAPINFOHEADER + 自下而上的 BGR 像素），不经过 PNG。"""
+    return _save(_opaque(image), "DIB")
+
+
+def encode_png(image: Image.Image) -> bytes:
+    return _save(image, "PNG", compress_level=PNG_COMPRESS_LEVEL)
+
+
+def encode_webp(image: Image.Image) -> bytes:
+    return _save(image, "WEBP", quality=OUTPUT_QUALITY)
+
+
+def encode_jpeg(image: Image.Image) -> bytes:
+    return _save(_opaque(image), "JPEG", quality=OUTPUT_QUALITY)
+
+
+_ENCODERS: Dict[str, Encoder] = {
+    "dib": encode_dib,
+    "png": encode_png,
+    "webp": encode_webp,
+    "jpeg": encode_jpeg,
+    "jpg": encode_jpeg,
+}
+
+
+def register_encoder(fmt: str, encoder: Encoder) -> None:
+    """注册（或替换）一种输出格式的编码器。"""
+    _ENCODERS[fmt.lower()] = encoder
+
+
+def encode_image(image: Image.Image, fmt: str = "png") -> bytes:
+    """按输出格式编码渲染结果（dib/png/webp/jpeg）。"""
+    encoder = _ENCODERS.get(fmt.lower())
+    if encoder is None:
+        raise ValueError(f"不支持的输出格式: {fmt}")
+    with span("encode"):
+        return encoder(image)
@@ -1,14 +1,19 @@
-from io import BytesIO
 from pathlib import Path
 from typing import Literal, Tuple, Union
 
 from PIL import Image
 
+from .decoration import decoration_ops
+from .dirty_region import draw_ops, paste_overlay
+from .image_cache import get_decoded_image
+from .image_encode import encode_image
+from .tracing import span
+
 Align = Literal["left", "center", "right"]
 VAlign = Literal["top", "middle", "bottom"]
 
 
-def paste_image_auto(
+def paste_image_into(
     image_source: Union[str, Path, Image.Image],
     top_left: Tuple[int, int],
     bottom_right: Tuple[int, int],
@@ -22,10 +27,10 @@ def paste_image_auto(
     max_image_size: Tuple[int, int] = (None, None),
     role_name: str = "unknown",
     text_configs_dict: dict | None = None,
-) -> bytes:
+) -> Image.Image:
     """
     在指定矩形内放置一张图片（content_image），按比例缩放至“最大但不超过”该矩形。
-    返回：最终 PNG 的 bytes。
+    返回：合成后的图像（未编码）。
     """
     if not isinstance(content_image, Image.Image):
         raise TypeError("content_image 必须为 PIL.Image.Image")
@@ -33,7 +38,7 @@ def paste_image_auto(
     if isinstance(image_source, Image.Image):
         img = image_source.copy()
     else:
-        img = Image.open(image_source).convert("RGBA")
+        img = get_decoded_image(image_source).copy()
 
     img_overlay = None
     if image_overlay is not None:
@@ -77,7 +82,8 @@ def paste_image_auto(
     new_w = max(1, int(round(cw * scale)))
     new_h = max(1, int(round(ch * scale)))
 
-    resized = content_image.resize((new_w, new_h), Image.LANCZOS)
+    with span("fit"):
+        resized = content_image.resize((new_w, new_h), Image.LANCZOS)
 
     if align == "left":
         px = x1 + padding
@@ -93,16 +99,23 @@ def paste_image_auto(
     else:
         py = y2 - padding - new_h
 
-    if keep_alpha and ("A" in resized.getbands()):
-        img.paste(resized, (px, py), resized)
-    else:
-        img.paste(resized, (px, py))
+    with span("draw"):
+        if keep_alpha and ("A" in resized.getbands()):
+            img.paste(resized, (px, py), resized)
+        else:
+            img.paste(resized, (px, py))
+
+        if image_overlay is not None and img_overlay is not None:
+            paste_overlay(img, img_overlay)
+        elif image_overlay is not None and img_overlay is None:
+            print("Warning: overlay image is not exist.")
+
+        # 角色姓名装饰字（与文本渲染共用按角色缓存的装饰字遮罩）
+        draw_ops(img, decoration_ops(role_name, text_configs_dict))
+
+    return img
 
-    if image_overlay is not None and img_overlay is not None:
-        img.paste(img_overlay, (0, 0), img_overlay)
-    elif image_overlay is not None and img_overlay is None:
-        print("Warning: overlay image is not exist.")
 
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+def paste_image_auto(*args, output_format: str = "png", **kwargs) -> bytes:
+    """paste_image_into 的结果按 output_format 编码后返回。"""
+    return encode_image(paste_image_into(*args, **kwargs), output_format)
@@ -14,8 +14,9 @@ def _to_level(name: str) -> int:
         return logging.INFO
 
 
-def setup_logging() -> Logger:
-    """Configure root logger to write to project_root/log.txt (overwrite on start) and console.
+def setup_logging(log_name: str = "log.txt") -> Logger:
+    """Configure root logger to write to project_root/<log_name> (overwrite on start) and console.
+    Headless entry points pass their own log_name so they never truncate the TUI's log.txt.
     Level is taken from settings.LOG_LEVEL (DEBUG/INFO/WARNING/ERROR/CRITICAL).
     Safe to call multiple times; only configures once.
     """
@@ -28,7 +29,7 @@ def setup_logging() -> Logger:
             h.setLevel(level)
         return logger
 
-    log_file = PROJECT_ROOT / "log.txt"
+    log_file = PROJECT_ROOT / log_name
     log_file.parent.mkdir(parents=True, exist_ok=True)
 
     level = _to_level(LOG_LEVEL)
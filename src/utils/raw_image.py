@@ -0,0 +1,62 @@
+import logging
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Union
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# 原始 RGBA 缓存格式：固定头（魔数 + 宽 + 高）后接未压缩像素
+RAW_SUFFIX = ".rgba"
+RAW_MAGIC = b"TBRGBA01"
+_HEADER = struct.Struct("<8sII")
+
+
+def save_raw(image: Image.Image, path: Union[str, Path]) -> None:
+    """以“头 + 像素缓冲”格式保存 RGBA 图像。"""
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(RAW_MAGIC, image.width, image.height))
+        f.write(image.tobytes("raw", "RGBA"))
+
+
+def load_raw(path: Union[str, Path]) -> Image.Image:
+    """读取 save_raw 写出的文件：一次读取后直接 frombuffer，无需解码。"""
+    with open(path, "rb") as f:
+        magic, width, height = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != RAW_MAGIC:
+            raise ValueError(f"不是有效的 RGBA 缓存文件: {path}")
+        buf = bytearray(width * height * 4)
+        if f.readinto(buf) != len(buf):
+            raise ValueError(f"RGBA 缓存文件不完整: {path}")
+    return Image.frombuffer("RGBA", (width, height), buf, "raw", "RGBA", 0, 1)
+
+
+def save_base(image: Image.Image, path: Union[str, Path]) -> None:
+    """按扩展名保存底图（.rgba 为原始格式，其余交给 Pillow），先写临时文件再原子替换。"""
+    path = Path(path)
+    # 临时文件名带进程/线程号：多个进程同时生成同一张底图时互不干扰
+    tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    if path.suffix == RAW_SUFFIX:
+        save_raw(image, tmp)
+    else:
+        image.save(tmp, format=Image.registered_extensions().get(path.suffix, "PNG"))
+    os.replace(tmp, path)
+
+
+def load_base(path: Union[str, Path]) -> Image.Image:
+    """按扩展名读取底图并返回 RGBA 图像。"""
+    t0 = time.perf_counter()
+    if Path(path).suffix == RAW_SUFFIX:
+        image = load_raw(path)
+    else:
+        image = Image.open(path).convert("RGBA")
+    logger.debug(
+        "底图解码: %s %.1f ms", Path(path).name, (time.perf_counter() - t0) * 1000
+    )
+    return image
@@ -1,11 +1,23 @@
-from io import BytesIO
 from pathlib import Path
 from typing import Literal, Tuple, Union
 
 from PIL import Image, ImageDraw, ImageFont
 
-from ..config.paths import FONT_DIR
-from ..config.settings import DEFAULT_FONT
+from ..config.settings import SCALED_RENDER
+from .decoration import decoration_ops
+from .dirty_region import (
+    DrawOp,
+    draw_ops,
+    paste_overlay,
+    render_scaled,
+    scaled_base,
+    text_mask,
+)
+from .fonts import load_font, warm_font
+from .image_cache import get_decoded_image
+from .image_encode import encode_image
+from .text_wrap import largest_fit, wrap_text
+from .tracing import span
 
 Align = Literal["left", "center", "right"]
 VAlign = Literal["top", "middle", "bottom"]
@@ -18,9 +30,13 @@ IMAGE_SETTINGS = {
 }
 
 
-def compress_image(image: Image.Image) -> Image.Image:
-    """压缩图像大小"""
-    width, height = image.size
+# 最近一次字号搜索结果：(字体, 区域, 上限, 行距) -> (文本长度, 字号)，用于相近长度文本的热启动
+_LAST_FIT: dict[tuple, tuple[int, int]] = {}
+
+
+def compressed_size(size: Tuple[int, int]) -> Tuple[int, int]:
+    """compress_image 输出的尺寸"""
+    width, height = size
     new_width = int(width * IMAGE_SETTINGS["resize_ratio"])
     new_height = int(height * IMAGE_SETTINGS["resize_ratio"])
 
@@ -33,10 +49,34 @@ def compress_image(image: Image.Image) -> Image.Image:
         ratio = IMAGE_SETTINGS["max_height"] / new_height
         new_height, new_width = IMAGE_SETTINGS["max_height"], int(new_width * ratio)
 
-    return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    return new_width, new_height
+
+
+def render_scale(size: Tuple[int, int], scaled_render: bool | None = None) -> float:
+    """draw_text_image 的绘制比例：按输出分辨率直接绘制时为输出宽度 / 原宽度，否则为 1。"""
+    if scaled_render is None:
+        scaled_render = SCALED_RENDER
+    return compressed_size(size)[0] / size[0] if scaled_render else 1.0
+
+
+def warm_text_resources(
+    font_path: Union[str, Path, None],
+    role_name: str,
+    text_configs_dict: dict | None,
+    base_size: Tuple[int, int],
+    scaled_render: bool | None = None,
+) -> None:
+    """预热 draw_text_image 在该底图尺寸下会用到的字体文件与姓名装饰字遮罩。"""
+    warm_font(font_path)
+    decoration_ops(role_name, text_configs_dict, render_scale(base_size, scaled_render))
+
+
+def compress_image(image: Image.Image) -> Image.Image:
+    """压缩图像大小"""
+    return image.resize(compressed_size(image.size), Image.Resampling.LANCZOS)
 
 
-def draw_text_auto(
+def draw_text_image(
     image_source: Union[str, Path, Image.Image],
     top_left: Tuple[int, int],
     bottom_right: Tuple[int, int],
@@ -51,20 +91,23 @@ def draw_text_auto(
     image_overlay: Union[str, Path, Image.Image, None] = None,
     role_name: str = "unknown",  # 添加角色名称参数
     text_configs_dict: dict | None = None,  # 添加文字配置字典参数
-) -> bytes:
+    scaled_render: bool | None = None,  # None 时使用 SCALED_RENDER 设置
+) -> Image.Image:
     """
     在指定矩形内自适应字号绘制文本；
     中括号及括号内文字使用 bracket_color。
+    scaled_render 为真时按原尺寸排版，绘制坐标、字号与装饰字位置按输出比例换算，
+    直接在缩放后的底图上绘制，省去整图重采样。
     """
 
     # --- 1. 打开图像 ---
+    # 底图只读共享：绘制在受影响区域的副本上进行，draw 仅用于测量
     if isinstance(image_source, Image.Image):
-        img = image_source.copy()
+        base = image_source
     else:
-        img = Image.open(image_source).convert("RGBA")
+        base = get_decoded_image(image_source)
 
-    # 压缩底图
-    draw = ImageDraw.Draw(img)
+    draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
 
     img_overlay = None
     if image_overlay is not None:
@@ -82,65 +125,32 @@ def draw_text_auto(
     x2, y2 = bottom_right
     if not (x2 > x1 and y2 > y1):
         raise ValueError("无效的文字区域。")
+
+    # 输出分辨率直接绘制：排版仍在原尺寸下进行（断行与字号不变），只换算绘制坐标与字号
+    if scaled_render is None:
+        scaled_render = SCALED_RENDER
+    scale = render_scale(base.size, scaled_render)
+    if scaled_render:
+        out_size = compressed_size(base.size)
+        base = scaled_base(base, out_size)
+        if img_overlay is not None:
+            img_overlay = img_overlay.resize(out_size, Image.Resampling.LANCZOS)
     region_w, region_h = x2 - x1, y2 - y1
 
     # --- 2. 字体加载 ---
     def _load_font(size: int) -> ImageFont.FreeTypeFont:
-        if font_path and Path(font_path).exists():
-            return ImageFont.truetype(str(font_path), size=size)
-        # 如果指定的字体不存在，尝试使用配置的默认字体
-        default_font_path = FONT_DIR / DEFAULT_FONT
-        if default_font_path.exists():
-            return ImageFont.truetype(str(default_font_path), size=size)
-        try:
-            return ImageFont.truetype("DejaVuSans.ttf", size=size)
-        except Exception:
-            return ImageFont.load_default()
+        return load_font(font_path, size)
 
     # --- 3. 文本包行 ---
     def wrap_lines(
-        txt: str, image_font: ImageFont.FreeTypeFont, max_w: int
+        txt: str,
+        image_font: ImageFont.FreeTypeFont,
+        max_w: int,
+        max_lines: int | None = None,
     ) -> list[str]:
-        text_lines: list[str] = []
-        for para in txt.splitlines() or [""]:
-            has_space = " " in para
-            units = para.split(" ") if has_space else list(para)
-            str_buf = ""
-
-            def unit_join(a: str, b: str) -> str:
-                if not a:
-                    return b
-                return (a + " " + b) if has_space else (a + b)
-
-            for u in units:
-                trial = unit_join(str_buf, u)
-                w = draw.textlength(trial, font=image_font)
-                if w <= max_w:
-                    str_buf = trial
-                else:
-                    if str_buf:
-                        text_lines.append(str_buf)
-                    if has_space and len(u) > 1:
-                        tmp = ""
-                        for ch in u:
-                            if int(draw.textlength(tmp + ch, font=image_font)) <= max_w:
-                                tmp += ch
-                            else:
-                                if tmp:
-                                    text_lines.append(tmp)
-                                tmp = ch
-                        str_buf = tmp
-                    else:
-                        if draw.textlength(u, font=image_font) <= max_w:
-                            str_buf = u
-                        else:
-                            text_lines.append(u)
-                            str_buf = ""
-            if str_buf != "":
-                text_lines.append(str_buf)
-            if para == "" and (not text_lines or text_lines[-1] != ""):
-                text_lines.append("")
-        return text_lines
+        return wrap_text(
+            txt, lambda s: draw.textlength(s, font=image_font), max_w, max_lines
+        )
 
     # --- 4. 测量 ---
     def measure_block(
@@ -155,19 +165,41 @@ def draw_text_auto(
         return max_w, total_h, line_h
 
     # --- 5. 搜索最大字号 ---
+    # 从估计字号出发倍增+二分（结果与全范围二分相同），行数超出高度即停止换行
     hi = min(region_h, max_font_height) if max_font_height else region_h
-    lo, best_size, best_lines, best_line_h, best_block_h = 1, 0, [], 0, 0
-
-    while lo <= hi:
-        mid = (lo + hi) // 2
-        font = _load_font(mid)
-        lines = wrap_lines(text, font, region_w)
-        w, h, lh = measure_block(lines, font)
-        if w <= region_w and h <= region_h:
-            best_size, best_lines, best_line_h, best_block_h = mid, lines, lh, h
-            lo = mid + 1
-        else:
-            hi = mid - 1
+    fitted: dict[int, tuple[list[str], int, int] | None] = {}
+
+    def try_size(size: int) -> tuple[list[str], int, int] | None:
+        if size not in fitted:
+            probe_font = _load_font(size)
+            ascent, descent = probe_font.getmetrics()
+            lh = int((ascent + descent) * (1 + line_spacing))
+            max_lines = region_h // lh if lh > 0 else None
+            lines = wrap_lines(text, probe_font, region_w, max_lines)
+            w, h, lh = measure_block(lines, probe_font)
+            fitted[size] = (lines, lh, h) if w <= region_w and h <= region_h else None
+        return fitted[size]
+
+    def estimate_size() -> int:
+        last = _LAST_FIT.get(fit_key)
+        if last is not None and abs(last[0] - len(text)) <= max(8, last[0] // 5):
+            return last[1]
+        # 面积估计：宽度与行高都随字号线性变化，总面积不超过矩形面积
+        ref_font = _load_font(hi)
+        ascent, descent = ref_font.getmetrics()
+        ref_lh = (ascent + descent) * (1 + line_spacing)
+        flat_w = draw.textlength(text.replace("\n", ""), font=ref_font)
+        if flat_w <= 0 or ref_lh <= 0:
+            return hi
+        paras = max(1, len(text.splitlines()))
+        by_area = hi * (region_w * region_h / (flat_w * ref_lh)) ** 0.5
+        by_height = hi * region_h / (paras * ref_lh)
+        return int(min(by_area, by_height))
+
+    fit_key = (str(font_path), region_w, region_h, hi, line_spacing)
+    with span("fit"):
+        best_size = largest_fit(hi, estimate_size(), lambda s: try_size(s) is not None)
+    _LAST_FIT[fit_key] = (len(text), best_size)
 
     if best_size == 0:
         font = _load_font(1)
@@ -176,6 +208,7 @@ def draw_text_auto(
         best_size = 1
     else:
         font = _load_font(best_size)
+        best_lines, best_line_h, best_block_h = fitted[best_size]
 
     # --- 6. 解析着色片段 ---
     def parse_color_segments(
@@ -212,7 +245,34 @@ def draw_text_auto(
     else:
         y_start = y2 - best_block_h
 
-    # --- 8. 绘制 ---
+    # --- 8. 排版为绘制操作 ---
+    draw_font = _load_font(max(1, round(best_size * scale))) if scale != 1.0 else font
+    shadow = 4 * scale  # 文字阴影偏移
+
+    def at(px: float, py: float) -> Tuple[int, int]:
+        return (round(px * scale), round(py * scale))
+
+    def line_fill(
+        segments: list[tuple[str, Tuple[int, int, int]]],
+        size: Tuple[int, int],
+        left: int,
+    ) -> Tuple[int, int, int] | Image.Image:
+        # 单色行直接用颜色；多色行按片段起点的累计步进（含字距调整）切分为竖条
+        if len({c for _, c in segments}) <= 1:
+            return segments[0][1] if segments else color
+        layer = Image.new("RGBA", size, (*segments[0][1], 255))
+        prefix, prev = segments[0][0], segments[0][1]
+        for seg_text, seg_color in segments[1:]:
+            if seg_color != prev:
+                # 该片段起点到行尾先整体填充，后续片段再覆盖各自的部分
+                start = max(0, round(draw_font.getlength(prefix)) - left)
+                if start < size[0]:
+                    layer.paste((*seg_color, 255), (start, 0, size[0], size[1]))
+                prev = seg_color
+            prefix += seg_text
+        return layer
+
+    text_ops: list[DrawOp] = []
     y = y_start
     in_bracket = False
     for ln in best_lines:
@@ -224,66 +284,43 @@ def draw_text_auto(
         else:
             x = x2 - line_w
         segments, in_bracket = parse_color_segments(ln, in_bracket)
-        for seg_text, seg_color in segments:
-            if seg_text:
-                draw.text(
-                    (x + 4, y + 4), seg_text, font=font, fill=(0, 0, 0)
-                )  # 文字阴影
-                draw.text((x, y), seg_text, font=font, fill=seg_color)
-                x += int(draw.textlength(seg_text, font=font))
+        # 整行只栅格化一次：阴影与正文共用同一遮罩，片段颜色按累计步进填充到颜色图层
+        rendered = text_mask(ln, draw_font)
+        if rendered is not None:
+            mask, (left, top) = rendered
+            sx, sy = at(x + shadow, y + shadow)
+            text_ops.append(((sx + left, sy + top), mask, None, (0, 0, 0)))  # 文字阴影
+            cx, cy = at(x, y)
+            fill = line_fill(segments, mask.size, left)
+            text_ops.append(((cx + left, cy + top), mask, None, fill))
         y += best_line_h
         if y - y_start > region_h:
             break
 
-    # 覆盖置顶图层（如果有）
-    if image_overlay is not None and img_overlay is not None:
-        img.paste(img_overlay, (0, 0), img_overlay)
-    elif image_overlay is not None and img_overlay is None:
-        print("Warning: overlay image is not exist.")
-
-    # 自动在图片上写角色专属文字
-    if text_configs_dict and role_name in text_configs_dict:
-        shadow_offset = (2, 2)  # 阴影偏移量
-        shadow_color = (0, 0, 0)  # 黑色阴影
-
-        for config in text_configs_dict[role_name]:
-            role_text = config["text"]
-            position = config["position"]
-            font_color = config["font_color"]
-            font_size = config["font_size"]
-
-            # 使用 resource/font 下的字体（使用配置的默认字体）
-            role_font_path = FONT_DIR / DEFAULT_FONT
-            if not role_font_path.exists():
-                # 如果配置的字体不存在，尝试使用其他可用字体作为后备
-                fallback_fonts = ["font3.ttf", "Song.ttf", "Yahei.ttf"]
-                role_font_path = None
-                for fallback in fallback_fonts:
-                    test_path = FONT_DIR / fallback
-                    if test_path.exists():
-                        role_font_path = test_path
-                        break
-                if role_font_path is None:
-                    # 如果所有字体都不存在，使用系统默认字体
-                    role_font = ImageFont.load_default()
-                else:
-                    role_font = ImageFont.truetype(str(role_font_path), font_size)
-            else:
-                role_font = ImageFont.truetype(str(role_font_path), font_size)
-
-            # 计算阴影位置
-            shadow_position = (
-                position[0] + shadow_offset[0],
-                position[1] + shadow_offset[1],
-            )
+    # 自动在图片上写角色专属文字（按角色缓存的装饰字遮罩）
+    role_ops = decoration_ops(role_name, text_configs_dict, scale)
+
+    # --- 9. 绘制并压缩 ---
+    if scaled_render or image_overlay is not None:
+        with span("draw"):
+            img = base.copy()
+            draw_ops(img, text_ops)
+            # 覆盖置顶图层（如果有）
+            if img_overlay is not None:
+                paste_overlay(img, img_overlay)
+            elif image_overlay is not None:
+                print("Warning: overlay image is not exist.")
+            draw_ops(img, role_ops)
+        if not scaled_render:
+            with span("downscale"):
+                img = compress_image(img)
+    else:
+        # 只在文字与姓名装饰所在区域绘制、重采样，贴回缓存的已缩放底图
+        img = render_scaled(base, [text_ops, role_ops], compressed_size(base.size))
 
-            # 先绘制阴影文字
-            draw.text(shadow_position, role_text, fill=shadow_color, font=role_font)
+    return img
 
-            # 再绘制主文字（覆盖在阴影上方）
-            draw.text(position, role_text, fill=font_color, font=role_font)
 
-    img = compress_image(img)
-    buf = BytesIO()
-    img.save(buf, format="png")
-    return buf.getvalue()
+def draw_text_auto(*args, output_format: str = "png", **kwargs) -> bytes:
+    """draw_text_image 的结果按 output_format 编码后返回。"""
+    return encode_image(draw_text_image(*args, **kwargs), output_format)
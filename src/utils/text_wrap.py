@@ -0,0 +1,129 @@
+import sys
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, Dict, List
+
+Measure = Callable[[str], float]
+
+
+def largest_fit(n: int, est: int, fits: Callable[[int], bool]) -> int:
+    """
+    返回 [0, n] 中满足 fits(k) 的最大 k（fits(0) 视为成立，且 fits 随 k 单调）。
+    从估计值 est 出发先倍增再二分，探测次数为 O(log |k - est|)。
+    """
+    est = max(0, min(n, est))
+    if est == 0 or fits(est):
+        lo, step = est, 1
+        while lo + step <= n and fits(lo + step):
+            lo += step
+            step *= 2
+        hi = min(lo + step, n + 1)
+    else:
+        hi, step = est, 1
+        while hi - step > 0 and not fits(hi - step):
+            hi -= step
+            step *= 2
+        lo = max(hi - step, 0)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def _split_long_unit(unit: str, measure: Measure, max_w: int) -> List[str]:
+    """按字符切分超长单词；每段至少 1 个字符，判定使用取整后的宽度。"""
+    chunks: List[str] = []
+    start = 0
+    while start < len(unit):
+        rest = len(unit) - start
+        k = largest_fit(
+            rest, 1, lambda k: int(measure(unit[start : start + k])) <= max_w
+        )
+        k = max(1, k)
+        chunks.append(unit[start : start + k])
+        start += k
+    return chunks
+
+
+def _wrap_paragraph(
+    para: str, measure: Measure, max_w: int, out: List[str], max_lines: int
+) -> bool:
+    has_space = " " in para
+    units = para.split(" ") if has_space else list(para)
+    joiner = " " if has_space else ""
+    n = len(units)
+
+    # 每个单元只测量一次，前缀和用于估计断行位置，再用整行实测校正
+    unit_w: Dict[str, float] = {}
+    for u in units:
+        if u not in unit_w:
+            unit_w[u] = measure(u)
+    joiner_w = measure(joiner) if joiner else 0.0
+    prefix = [0.0, *accumulate(unit_w[u] + joiner_w for u in units)]
+
+    def joined(buf: str, i: int, k: int) -> str:
+        # 与逐个拼接等价：buf 为空时前导空单元不产生空格
+        if not buf:
+            while k > 0 and units[i] == "":
+                i += 1
+                k -= 1
+            return joiner.join(units[i : i + k])
+        if k == 0:
+            return buf
+        return buf + joiner + joiner.join(units[i : i + k])
+
+    i, buf = 0, ""
+    while i < n:
+        if len(out) > max_lines:
+            return False
+        budget = max_w - measure(buf) if buf else max_w + joiner_w
+        est = bisect_right(prefix, prefix[i] + budget) - 1 - i
+        k = largest_fit(n - i, est, lambda k: measure(joined(buf, i, k)) <= max_w)
+        buf = joined(buf, i, k)
+        i += k
+        if i >= n:
+            break
+
+        # 第 i 个单元放不下：先输出当前行，再处理该单元
+        u = units[i]
+        i += 1
+        if buf:
+            out.append(buf)
+        if has_space and len(u) > 1:
+            chunks = _split_long_unit(u, measure, max_w)
+            out.extend(chunks[:-1])
+            buf = chunks[-1]
+        elif measure(u) <= max_w:
+            buf = u
+        else:
+            out.append(u)
+            buf = ""
+
+    if buf != "":
+        out.append(buf)
+    if para == "" and (not out or out[-1] != ""):
+        out.append("")
+    return len(out) <= max_lines
+
+
+def wrap_text(
+    text: str, measure: Measure, max_w: int, max_lines: int | None = None
+) -> List[str]:
+    """
+    在宽度 max_w 内贪心换行：有空格的段落按单词、否则按字符断行，超长单词按字符切分。
+
+    结果与逐字符累加测量整行宽度的朴素实现一致，但每个单元只测量一次，
+    断行位置由前缀和估计后只需少量整行测量校正；单段最坏为 O(n log n) 次字符测量。
+    不采用只扫描前缀和的线性算法：单元宽度之和不含字距调整，与整行实测可能相差
+    几个像素，断行位置必须以整行实测为准，校正时的倍增/二分带来 log 因子。
+    指定 max_lines 时，一旦行数超过该值立即返回（此时结果不完整，仅用于判定放不下）。
+    """
+    limit = max_lines if max_lines is not None else sys.maxsize
+    lines: List[str] = []
+    for para in text.splitlines() or [""]:
+        if not _wrap_paragraph(para, measure, max_w, lines, limit):
+            break
+    return lines
@@ -0,0 +1,146 @@
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Union
+
+from ..config.settings import TRACE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# 关闭时 span() 直接返回该对象，开销只有一次属性判断
+_NULL = nullcontext()
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class Tracer:
+    """
+    分阶段计时：generation() 为一次生成分配编号，期间各 span() 的耗时按阶段累加，
+    结束时写入各阶段的滑动窗口（最近 window 次），用于统计 p50/p95/max。
+    不在 generation 内的 span（如批处理）单独记入窗口。线程安全。
+    """
+
+    def __init__(self, enabled: bool = True, window: int = 200) -> None:
+        self.enabled = enabled
+        self.window = window
+        self.generations = 0
+        self._ids = itertools.count(1)
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _record(self, stage: str, ms: float) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(ms)
+
+    @contextmanager
+    def _generation(self, label: str) -> Iterator[int]:
+        gen_id = next(self._ids)
+        stages: Dict[str, float] = {}
+        outer = getattr(self._local, "stages", None)
+        self._local.stages = stages
+        t0 = time.perf_counter()
+        try:
+            yield gen_id
+        finally:
+            total = (time.perf_counter() - t0) * 1000
+            self._local.stages = outer
+            for stage, ms in stages.items():
+                self._record(stage, ms)
+            self._record("total", total)
+            with self._lock:
+                self.generations += 1
+            logger.info(
+                "%s #%d 耗时 %.1f ms: %s",
+                label,
+                gen_id,
+                total,
+                " | ".join(f"{k} {v:.1f}" for k, v in stages.items()) or "-",
+            )
+
+    def generation(self, label: str = "生成"):
+        """包住一次完整的生成流程；关闭时为空操作。"""
+        if not self.enabled:
+            return _NULL
+        return self._generation(label)
+
+    def record(self, stage: str, ms: float) -> None:
+        """记录一段已测得的耗时（如排队等待），规则与 span() 相同。"""
+        if not self.enabled:
+            return
+        stages = getattr(self._local, "stages", None)
+        if stages is None:
+            self._record(stage, ms)
+        else:
+            stages[stage] = stages.get(stage, 0.0) + ms
+
+    @contextmanager
+    def _span(self, stage: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - t0) * 1000)
+
+    def span(self, stage: str):
+        """计时一个阶段；同一次生成内同名阶段的耗时累加。"""
+        if not self.enabled:
+            return _NULL
+        return self._span(stage)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            snapshot = {k: sorted(v) for k, v in self._samples.items()}
+        return {
+            stage: {
+                "count": len(ordered),
+                "p50_ms": round(_percentile(ordered, 0.5), 2),
+                "p95_ms": round(_percentile(ordered, 0.95), 2),
+                "max_ms": round(ordered[-1], 2),
+            }
+            for stage, ordered in snapshot.items()
+            if ordered
+        }
+
+    def status_line(self) -> str | None:
+        """TUI 状态行：总耗时与最慢的几个阶段（按 p50）。"""
+        if not self.enabled or not self.generations:
+            return None
+        stats = self.summary()
+        total = stats.pop("total", None)
+        if total is None:
+            return None
+        slowest = sorted(stats.items(), key=lambda kv: -kv[1]["p50_ms"])[:4]
+        stages = "  ".join(f"{k} {v['p50_ms']:.0f}" for k, v in slowest)
+        return (
+            f"耗时(ms，最近 {total['count']} 次) p50 {total['p50_ms']:.0f} / "
+            f"p95 {total['p95_ms']:.0f} / max {total['max_ms']:.0f}  [{stages}]"
+        )
+
+    def dump(self, path: Union[str, Path]) -> None:
+        """将各阶段统计写入 JSON 文件。"""
+        if not self.enabled:
+            return
+        data = {"generations": self.generations, "stages": self.summary()}
+        Path(path).write_text(
+            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        logger.info("耗时统计已写入 %s", path)
+
+
+# 进程内共享的计时器
+tracer = Tracer(enabled=TRACE_ENABLED)
+span = tracer.span